@@ -0,0 +1,78 @@
+"""
+Micro-benchmark of the MonteCarloDataFeed tick rate.
+
+Compares the per-tick pandas indexing of the original feed loop (before)
+with the iteration over the NumPy buffers built in initialize (after).
+
+python -m benchmarks.feed --steps 1826 --repeat 5
+"""
+import argparse
+import datetime as dt
+import time
+
+from paths import GeometricBrownianMotion
+from src.core.feed.data import DataFeedObserver
+from src.core.feed.monte_carlo import MonteCarloDataFeed
+
+
+class TickCounter(DataFeedObserver):
+
+    def __init__(self):
+        self.ticks = 0
+
+    def upon_notification(self, feed, *args, **kwargs):
+        self.ticks += 1
+
+    def tick_handler(self, feed):
+        return self.upon_tick
+
+    def upon_tick(self, tick):
+        self.ticks += 1
+
+
+class PandasIndexingDataFeed(MonteCarloDataFeed):
+    """
+    The original feed loop: pandas indexing on every tick.
+    """
+
+    def start(self) -> None:
+        col = self.columns
+        epsilon = dt.timedelta(seconds=1.0)
+        self.time.reset(date=self.dataset.index.min() - epsilon)
+
+        for k in range(len(self.dataset)):
+            self.time.update(self.dataset.index[k])
+            self.price = self.dataset[col].iloc[k].to_numpy()[0]
+            self.notify()
+
+
+def tick_rate(feed_cls, df_paths, repeat: int) -> float:
+    best = float("inf")
+    ticks = 0
+    for _ in range(repeat):
+        feed = feed_cls(df_paths, columns=[0, ])
+        counter = TickCounter()
+        feed.subscribe(counter)
+        feed.initialize()
+
+        st_time = time.perf_counter()
+        feed.start()
+        best = min(best, time.perf_counter() - st_time)
+        ticks = counter.ticks
+    return ticks / best
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--steps", type=int, default=1826)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    gbm = GeometricBrownianMotion(volatility=0.25, maturity=args.steps / 365, time_intervals=args.steps - 1)
+    gbm.generate(1)
+    df = gbm.to_datetime_index(start=dt.datetime(2020, 1, 1))
+
+    before = tick_rate(PandasIndexingDataFeed, df, args.repeat)
+    after = tick_rate(MonteCarloDataFeed, df, args.repeat)
+    print(f"before: {before:,.0f} ticks/s")
+    print(f"after:  {after:,.0f} ticks/s ({after / before:.1f}x)")
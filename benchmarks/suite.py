@@ -0,0 +1,279 @@
+"""
+Benchmark suite of the hot paths, with results saved as JSON.
+
+Each case is timed (best of --repeat runs), then run once more under
+tracemalloc for its peak memory. Cases running over a process pool are
+traced with a single in-process worker, tracemalloc only seeing the current
+process. Throughputs are in the unit of the case (paths, ticks or agents
+per second).
+
+python -m benchmarks.suite run --out results.json
+python -m benchmarks.suite run --paths 100 --steps 366 --cases gbm_generate feed_start
+python -m benchmarks.suite compare before.json after.json --threshold 0.10
+"""
+import argparse
+import datetime as dt
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+from functools import partial
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.feed import TickCounter
+from paths import GeometricBrownianMotion, OrnsteinUhlenbeckProcess, BrownianBridge
+from paths.gbm import GeometricBrownianMotionCandle
+from src.core.analytics import AnalyticsEngine
+from src.core.context.runner import BacktestRunner
+from src.core.feed.data import Tick
+from src.core.feed.monte_carlo import MonteCarloDataFeed
+from src.cppi.strategy import CppiStrategy
+from src.cppi.vectorized import VectorizedCppiStrategy
+
+START = dt.datetime(2020, 1, 1)
+
+# Registered cases: name -> (setup, unit, pool)
+CASES = {}
+
+
+def case(unit: str, pool: bool = False):
+    """
+    Registers a case. Its setup takes the arguments and returns the timed
+    callable and the number of units it processes. With pool, the case runs
+    over args.workers processes.
+    """
+    def register(setup):
+        CASES[setup.__name__] = (setup, unit, pool)
+        return setup
+    return register
+
+
+def gbm_paths(nb_paths: int, steps: int, seed: int = 40) -> pd.DataFrame:
+    gbm = GeometricBrownianMotion(volatility=0.60, drift=0.20, initial_value=100.0,
+                                  maturity=(steps - 1) / 365, time_intervals=steps - 1, seed=seed)
+    gbm.generate(nb_paths)
+    return gbm.to_datetime_index(start=START)
+
+
+def cppi_factory():
+    return CppiStrategy(floor=0.80, initial_value=100000.0, reset_freq=dt.timedelta(days=100))
+
+
+# Path generation
+
+@case("paths/s")
+def gbm_generate(args):
+    gbm = GeometricBrownianMotion(volatility=0.25, maturity=(args.steps - 1) / 365, time_intervals=args.steps - 1)
+    return partial(gbm.generate, args.paths), args.paths
+
+
+@case("paths/s")
+def ou_generate(args):
+    ou = OrnsteinUhlenbeckProcess(volatility=0.1, mean_reversion=2.0,
+                                  maturity=(args.steps - 1) / 365, time_intervals=args.steps - 1)
+    return partial(ou.generate, args.paths), args.paths
+
+
+@case("paths/s")
+def bridge_generate(args):
+    bb = BrownianBridge(volatility=0.25, maturity=(args.steps - 1) / 365, time_intervals=args.steps - 1)
+    return partial(bb.generate, args.paths), args.paths
+
+
+@case("paths/s")
+def gbm_candle_generate(args):
+    gbm = GeometricBrownianMotionCandle(volatility=0.25, sampling_rate=args.sampling_rate,
+                                        maturity=(args.steps - 1) / 365, time_intervals=args.steps - 1)
+    return partial(gbm.generate, args.paths, start=START), args.paths
+
+
+# Backtesting engine
+
+@case("ticks/s")
+def feed_start(args):
+    df = gbm_paths(1, args.steps)
+
+    def run():
+        feed = MonteCarloDataFeed(df, columns=[0, ])
+        feed.subscribe(TickCounter())
+        feed.initialize()
+        feed.start()
+    return run, args.steps
+
+
+@case("ticks/s")
+def cppi_update(args):
+    df = gbm_paths(1, args.steps)
+
+    # Ticks as pushed by the feed, built beforehand (only the strategy is timed)
+    feed = MonteCarloDataFeed(df, columns=[0, ])
+    feed.initialize()
+    ticks = []
+    for timestamp, year_fraction, price in zip(feed.index, feed.year_fractions.tolist(), feed.prices[:, 0].tolist()):
+        tick = Tick()
+        tick.timestamp, tick.year_fraction, tick.bid, tick.ask = timestamp, year_fraction, price, price
+        ticks.append(tick)
+
+    def run():
+        handler = cppi_factory().tick_handler(feed)
+        for tick in ticks:
+            handler(tick)
+    return run, args.steps
+
+
+@case("agents/s")
+def summarize(args):
+    df = gbm_paths(args.agents, args.steps)
+    with redirect_stdout(io.StringIO()):
+        analytics = BacktestRunner(df, cppi_factory, workers=1).run()
+
+    def run():
+        for agent in analytics.realizations:
+            AnalyticsEngine.summarize(agent)
+    return run, args.agents
+
+
+# main.py scenario (5 years of daily GBM paths, floor 80%, resets every 100 days)
+
+@case("paths/s", pool=True)
+def main_scenario(args):
+    df = gbm_paths(args.scenario_paths, 5 * 365 + 1)
+
+    def run():
+        with redirect_stdout(io.StringIO()):
+            BacktestRunner(df, cppi_factory, workers=args.workers).run()
+    return run, args.scenario_paths
+
+
+@case("paths/s")
+def main_scenario_batched(args):
+    df = gbm_paths(args.scenario_paths, 5 * 365 + 1)
+    cppi = VectorizedCppiStrategy(floor=0.80, initial_value=100000.0, reset_freq=dt.timedelta(days=100))
+    return partial(cppi.run, df), args.scenario_paths
+
+
+def measure(name: str, args) -> dict:
+    setup, unit, pool = CASES[name]
+    run, units = setup(args)
+
+    times = []
+    for _ in range(args.repeat):
+        st_time = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - st_time)
+
+    # Separate run: tracing slows down allocations (workers would not be traced)
+    if pool:
+        run, _ = setup(argparse.Namespace(**{**vars(args), "workers": 1}))
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    best = min(times)
+    return {"wall_time": best,
+            "mean_time": sum(times) / len(times),
+            "throughput": units / best,
+            "unit": unit,
+            "peak_memory": peak,
+            "repeat": args.repeat}
+
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = None
+    return {"date": dt.datetime.now().isoformat(timespec="seconds"),
+            "commit": commit or None,
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count()}
+
+
+def run_suite(args) -> dict:
+    names = args.cases if args.cases else list(CASES)
+    results = {}
+    for name in names:
+        results[name] = measure(name, args)
+        r = results[name]
+        print(f"{name:<24} {r['wall_time']:>9.4f}s {r['throughput']:>14,.1f} {r['unit']:<9} "
+              f"{r['peak_memory'] / 2 ** 20:>9.1f} MiB", file=sys.stderr)
+
+    params = {k: getattr(args, k) for k in ("paths", "steps", "sampling_rate", "agents",
+                                              "scenario_paths", "workers", "repeat")}
+    return {"environment": environment(), "params": params, "results": results}
+
+
+def compare(before: dict, after: dict, threshold: float) -> list:
+    """
+    Cases whose wall time or peak memory grew by more than threshold
+    (relative), printed along with the ratios of every case in both files.
+    """
+    if before.get("params") != after.get("params"):
+        print("warning: the files were run with different parameters", file=sys.stderr)
+
+    regressions = []
+    print(f"{'case':<24} {'before':>10} {'after':>10} {'ratio':>7} {'memory':>7}")
+    for name, old in before["results"].items():
+        new = after["results"].get(name)
+        if new is None:
+            continue
+        ratio = new["wall_time"] / old["wall_time"]
+        memory = new["peak_memory"] / max(1, old["peak_memory"])
+        flags = []
+        if ratio > 1.0 + threshold:
+            flags.append("TIME")
+        if memory > 1.0 + threshold:
+            flags.append("MEMORY")
+        flag = f"  REGRESSION ({', '.join(flags)})" if flags else ""
+        if flags:
+            regressions.append(name)
+        print(f"{name:<24} {old['wall_time']:>9.4f}s {new['wall_time']:>9.4f}s {ratio:>6.2f}x {memory:>6.2f}x{flag}")
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="run the suite")
+    run_parser.add_argument("--cases", nargs="*", choices=sorted(CASES), help="subset of the cases (all by default)")
+    run_parser.add_argument("--paths", type=int, default=1000, help="paths of the generators")
+    run_parser.add_argument("--steps", type=int, default=1826, help="time steps of paths and feeds")
+    run_parser.add_argument("--sampling-rate", type=int, default=10, help="samples per candle")
+    run_parser.add_argument("--agents", type=int, default=50, help="agents to summarize")
+    run_parser.add_argument("--scenario-paths", type=int, default=500, help="paths of the main.py scenario")
+    run_parser.add_argument("--workers", type=int, default=None, help="workers of the main.py scenario")
+    run_parser.add_argument("--repeat", type=int, default=3)
+    run_parser.add_argument("--out", default=None, help="JSON file (stdout by default)")
+
+    compare_parser = commands.add_parser("compare", help="compare two result files")
+    compare_parser.add_argument("before")
+    compare_parser.add_argument("after")
+    compare_parser.add_argument("--threshold", type=float, default=0.10,
+                                help="tolerated slowdown or memory growth (relative)")
+
+    args = parser.parse_args()
+
+    if args.command == "run":
+        report = run_suite(args)
+        if args.out is None:
+            json.dump(report, sys.stdout, indent=2)
+        else:
+            with open(args.out, "w") as f:
+                json.dump(report, f, indent=2)
+
+    else:
+        with open(args.before) as f_before, open(args.after) as f_after:
+            regressed = compare(json.load(f_before), json.load(f_after), args.threshold)
+        sys.exit(1 if regressed else 0)
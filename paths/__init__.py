@@ -1,3 +1,5 @@
 from paths.ou import OrnsteinUhlenbeckProcess
 from paths.gbm import GeometricBrownianMotion
 from paths.bridge import BrownianBridge
+from paths.store import PathStore
+from paths.cache import PathCache
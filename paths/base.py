@@ -1,17 +1,21 @@
 import copy
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
 
 import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
 from paths.utils.time import TimeGenerator
+from paths.utils.samples import RandomNumberGenerator1d
+from paths.store import PathStore
 
 
 class StochasticProcess(ABC):
 
     def __init__(self, volatility: float, maturity: float = 1.0, time_intervals: int = 365,
-                 initial_value: float = 1.0, seed: int = None):
+                 initial_value: float = 1.0, seed: int = None, dtype=np.float64,
+                 sampling: str = "pseudo", bridge_ordering: bool = False):
         #
         # Common to all stochastic processes
         self.volatility = max(0.0, float(volatility))
@@ -23,9 +27,11 @@ class StochasticProcess(ABC):
         # Monte Carlo paths
         self.paths: Optional[pd.DataFrame] = None
         self.nb_paths: int = 0
+        self.dtype = np.dtype(dtype)
 
+        # Explicit random streams (no global seeding), with optional variance reduction
         self.seed = seed if seed is not None else 0
-        np.random.seed(self.seed)
+        self.rng = RandomNumberGenerator1d(seed=self.seed, sampling=sampling, bridge_ordering=bridge_ordering)
 
     @property
     def schedule(self):
@@ -35,13 +41,106 @@ class StochasticProcess(ABC):
     def dt(self):
         return self.time.dt
 
-    def __call__(self, nb_paths: int, regenerate: bool = True):
-        return self.generate(nb_paths, regenerate=regenerate)
+    @property
+    def params(self) -> dict:
+        """
+        Characteristics of the process (completed by child classes).
+        """
+        return {"volatility": self.volatility,
+                "initial_value": self.initial_value,
+                "maturity": self.time.maturity,
+                "time_intervals": self.time.intervals,
+                "seed": self.seed,
+                "dtype": self.dtype.name,
+                "sampling": self.rng.sampling,
+                "bridge_ordering": self.rng.bridge_ordering}
+
+    def __call__(self, nb_paths: int, regenerate: bool = True, workers: int = None, cache=None):
+        return self.generate(nb_paths, regenerate=regenerate, workers=workers, cache=cache)
+
+    def generate(self, nb_paths: int = 1, regenerate: bool = True, workers: int = None, cache=None):
+        """
+        Generates the paths, or reads them from a PathCache if given.
+        """
+        if self.paths is None or regenerate or self.nb_paths != nb_paths:
+            if cache is not None:
+                paths = cache.simulate(self, nb_paths, workers=workers)
+            else:
+                paths = self.simulate(nb_paths, workers=workers)
+            self.paths = pd.DataFrame(paths, index=self.schedule, copy=False)
+        return self.paths
+
+    def simulate(self, nb_paths: int, workers: int = None, out: np.ndarray = None) -> np.ndarray:
+        """
+        Generates the paths as a (steps, paths) array.
+
+        The array is preallocated (or given, e.g. a memmap) and filled by blocks
+        of paths (those of the random number generator), over a pool of workers
+        threads if requested. Each block has its own random stream: results do
+        not depend on workers.
+        """
+        self.nb_paths = max(1, int(nb_paths))
+        out = np.empty((self.time.steps, self.nb_paths), dtype=self.dtype) if out is None else out
+        assert out.shape == (self.time.steps, self.nb_paths), "out must be shaped (steps, paths)"
+
+        # Same draw for all the blocks
+        draw = self.rng.next_draw()
+
+        def generate_block(block):
+            _, start, stop = block
+            self._generate_block(out[:, start:stop], draw=draw, offset=start)
+
+        blocks = self.rng.blocks(self.nb_paths)
+        if workers is None or workers <= 1 or len(blocks) == 1:
+            for b in blocks:
+                generate_block(b)
+        else:
+            # NumPy releases the GIL in the random fills and array operations
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                list(pool.map(generate_block, blocks))
+
+        return out
 
     @abstractmethod
-    def generate(self, nb_paths: int = 1, regenerate: bool = True):
+    def _generate_block(self, out: np.ndarray, draw: int, offset: int):
+        """
+        Fills out, shaped (steps, paths), with the paths offset to offset + paths
+        of the given draw of the random number generator.
+        """
         raise NotImplementedError("Child classes must implement this method.")
 
+    def iter_blocks(self, nb_paths: int):
+        """
+        Yields the paths by blocks as (first path, (steps, block paths) array),
+        without ever holding all the paths in memory.
+        """
+        draw = self.rng.next_draw()
+        for _, start, stop in self.rng.blocks(max(1, int(nb_paths))):
+            out = np.empty((self.time.steps, stop - start), dtype=self.dtype, order="F")
+            self._generate_block(out, draw=draw, offset=start)
+            yield start, out
+
+    def write(self, path: str, nb_paths: int, workers: int = None,
+              start: datetime = None, basis=365) -> PathStore:
+        """
+        Generates the paths straight into a PathStore on disk (memory-mapped),
+        along with a header describing the process, seed and time grid.
+        """
+        nb_paths = max(1, int(nb_paths))
+        start = start if start is not None else datetime.today()
+
+        meta = {"process": type(self).__name__,
+                "params": self.params,
+                "draw": self.rng.draws,
+                "schedule": self.schedule.tolist(),
+                "start": start.isoformat(),
+                "basis": basis}
+        store = PathStore.create(path, shape=(self.time.steps, nb_paths), dtype=self.dtype, meta=meta)
+
+        self.simulate(nb_paths, workers=workers, out=store.paths)
+        store.flush()
+        return store
+
     def to_datetime_index(self, start: datetime = None, basis=365):
         if self.paths is None:
             self.generate()
@@ -1,8 +1,5 @@
-import six
 import numpy as np
-import pandas as pd
 
-from paths.utils.samples import RandomNumberGenerator1d
 from paths.base import StochasticProcess
 
 
@@ -20,42 +17,43 @@ class BrownianBridge(StochasticProcess):
 
     """
 
-    def __init__(self, volatility: float, maturity: float = 1.0, time_intervals: int = 365):
+    def __init__(self, volatility: float, maturity: float = 1.0, time_intervals: int = 365,
+                 initial_value: float = 0.0, final_value: float = 0.0, seed: int = 0, dtype=np.float32,
+                 sampling: str = "pseudo", bridge_ordering: bool = False):
         #
         # Parent
-        super().__init__(volatility=volatility, initial_value=0.0,
-                         maturity=maturity, time_intervals=time_intervals)
+        super().__init__(volatility=volatility, initial_value=initial_value,
+                         maturity=maturity, time_intervals=time_intervals, seed=seed, dtype=dtype,
+                         sampling=sampling, bridge_ordering=bridge_ordering)
 
-    def __generate_bridge(self, nb_paths: int):
+        # Value the bridge is pinned to at maturity
+        self.final_value = float(final_value)
 
-        # Set for future reference
-        self.nb_paths = nb_paths
+    @property
+    def params(self) -> dict:
+        return {**super().params, "final_value": self.final_value}
 
-        # References for speed...
-        time_steps = self.time.steps
-        vol = self.volatility
-
-        # Time scaling
-        dt = 1.0 / (time_steps - 1)
-        dt_sqrt = np.sqrt(dt)
-
-        bridge = np.empty((nb_paths, time_steps), dtype=np.float32)
-        bridge[:, 0] = 0
-
-        for n in range(0, time_steps - 2):
-            t = n * dt
-            xi = np.random.randn(nb_paths) * dt_sqrt * vol
-            bridge[:, n + 1] = bridge[:, n] * (1 - dt / (1 - t)) + xi
+    def _generate_block(self, out: np.ndarray, draw: int, offset: int):
 
-        # Force to zero on last time step
-        bridge[:, -1] = 0.0
-
-        return pd.DataFrame(bridge.T, index=self.schedule)
-
-    def generate(self, nb_paths: int = 1, regenerate: bool = True):
-        if self.paths is None or regenerate or self.nb_paths != nb_paths:
-            self.paths = self.__generate_bridge(nb_paths=nb_paths)
-        return self.paths
+        # References for speed...
+        time_steps, nb_paths = out.shape
+        schedule = self.schedule
+        maturity = schedule[-1]
+
+        # Brownian motion W on the time grid, all increments drawn at once
+        bridge = out
+        bridge[0, :] = 0.0
+        self.rng.normal(samples=time_steps - 1, paths=nb_paths, out=bridge[1:, :], draw=draw, offset=offset)
+        bridge[1:, :] *= (self.volatility * np.sqrt(np.diff(schedule)))[:, None]
+        np.cumsum(bridge, axis=0, out=bridge)
+
+        # Pinned at both ends: W(t) - t / T * W(T), plus the line from start to end values
+        weights = (schedule / maturity).astype(self.dtype)
+        bridge -= np.multiply.outer(weights, bridge[-1, :])
+        bridge += (self.initial_value + (self.final_value - self.initial_value) * weights)[:, None]
+
+        # Exactly on the end value at maturity
+        bridge[-1, :] = self.final_value
 
 
 if __name__ == '__main__':
@@ -0,0 +1,128 @@
+import glob
+import hashlib
+import json
+import os
+from typing import Optional
+
+import numpy as np
+
+from paths.store import PathStore
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "backtesting", "paths")
+
+
+class PathCache(object):
+    """
+    On-disk cache of generated path sets, with a size-bounded LRU eviction.
+
+    Entries are PathStores named by a hash of the process class, parameters
+    (seed included) and position in its random streams: the same process
+    generates the same paths, which are then memory-mapped instead of being
+    generated again. Since the first k paths of a draw do not depend on the
+    number of paths, a cached set also serves any smaller number of paths.
+
+    For example:
+
+    cache = PathCache(max_bytes=4 * 2 ** 30)
+    gbm = GeometricBrownianMotion(volatility=0.25, seed=40)
+    gbm.generate(10000, cache=cache)  # generated and stored
+    gbm = GeometricBrownianMotion(volatility=0.25, seed=40)
+    gbm.generate(500, cache=cache)  # first 500 paths, read from disk
+
+    """
+
+    def __init__(self, directory: str = None, max_bytes: int = 8 * 2 ** 30):
+        self.directory = directory if directory is not None else DEFAULT_CACHE_DIR
+        self.max_bytes = int(max_bytes)
+        os.makedirs(self.directory, exist_ok=True)
+
+    @staticmethod
+    def key(process) -> str:
+        """
+        Content address of the paths the process is about to generate.
+        """
+        rng = process.rng
+        content = {"process": type(process).__name__,
+                   "params": process.params,
+                   "draw": rng.draws,
+                   "block_size": rng.block_size,
+                   "bit_generator": rng.bit_generator.__name__}
+        return hashlib.sha256(json.dumps(content, sort_keys=True).encode()).hexdigest()[:32]
+
+    def __stem(self, key: str) -> str:
+        return os.path.join(self.directory, key)
+
+    def get(self, process, nb_paths: int) -> Optional[np.ndarray]:
+        """
+        Cached paths (read-only memmap) if at least nb_paths are stored, else None.
+        """
+        stem = self.__stem(self.key(process))
+        if not PathStore.exists(stem):
+            return None
+
+        store = PathStore(stem)
+        if store.nb_paths < nb_paths:
+            return None
+
+        os.utime(stem + ".json")  # most recently used
+        return store.paths[:, :nb_paths]
+
+    def simulate(self, process, nb_paths: int, workers: int = None) -> np.ndarray:
+        """
+        Same as process.simulate, served from the cache whenever possible.
+        """
+        nb_paths = max(1, int(nb_paths))
+        key = self.key(process)
+
+        paths = self.get(process, nb_paths)
+        if paths is not None:
+            # As if generated: the next draw of the process is a new one
+            process.nb_paths = nb_paths
+            process.rng.next_draw()
+            return paths
+
+        # Written under a temporary name, then published (header last)
+        tmp = self.__stem(f"{key}.{os.getpid()}.tmp")
+        process.write(tmp, nb_paths, workers=workers)
+        os.replace(tmp + ".npy", self.__stem(key) + ".npy")
+        os.replace(tmp + ".json", self.__stem(key) + ".json")
+
+        self.evict(keep=key)
+        return PathStore(self.__stem(key)).paths
+
+    def entries(self) -> list:
+        """
+        Cached entries as (last use, size in bytes, stem), least recently used first.
+        """
+        entries = []
+        for header in glob.glob(os.path.join(self.directory, "*.json")):
+            stem = header[:-len(".json")]
+            if stem.endswith(".tmp") or not PathStore.exists(stem):
+                continue
+            size = os.path.getsize(stem + ".npy") + os.path.getsize(header)
+            entries.append((os.path.getmtime(header), size, stem))
+        return sorted(entries)
+
+    @property
+    def size(self) -> int:
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self, keep: str = None):
+        """
+        Removes the least recently used entries until the cache fits in max_bytes.
+        """
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, stem in entries:
+            if total <= self.max_bytes:
+                break
+            if keep is not None and stem == self.__stem(keep):
+                continue
+            os.remove(stem + ".json")
+            os.remove(stem + ".npy")
+            total -= size
+
+    def clear(self):
+        for _, _, stem in self.entries():
+            os.remove(stem + ".json")
+            os.remove(stem + ".npy")
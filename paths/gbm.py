@@ -1,10 +1,13 @@
+from datetime import datetime, timedelta
+
 import numpy as np
 import pandas as pd
 
-from paths.utils.samples import RandomNumberGenerator1d
 from paths.base import StochasticProcess
 from paths.utils.time import TimeGenerator
 
+OHLC_FIELDS = ("open", "high", "low", "close")
+
 
 class GeometricBrownianMotion(StochasticProcess):
     """
@@ -21,45 +24,38 @@ class GeometricBrownianMotion(StochasticProcess):
     """
 
     def __init__(self, volatility: float, drift: float = 0.0, initial_value: float = 1.0,
-                 maturity: float = 1.0, time_intervals: int = 365, seed: int = 0):
+                 maturity: float = 1.0, time_intervals: int = 365, seed: int = 0, dtype=np.float64,
+                 sampling: str = "pseudo", bridge_ordering: bool = False):
         super().__init__(volatility=volatility, initial_value=initial_value,
-                         maturity=maturity, time_intervals=time_intervals, seed=seed)
+                         maturity=maturity, time_intervals=time_intervals, seed=seed, dtype=dtype,
+                         sampling=sampling, bridge_ordering=bridge_ordering)
 
         # GBM Characteristic
         self.drift = float(drift)  # annual
 
     @property
-    def dW(self):
-        _dW = RandomNumberGenerator1d.normal(samples=self.time.intervals + 1, paths=self.nb_paths)
-        _dW[0, :] = 0.0  # no uncertainty at present
-        return _dW
+    def params(self) -> dict:
+        return {**super().params, "drift": self.drift}
 
     @property
-    def sigma_dW(self):
-        return self.volatility * np.sqrt(self.time.dt) * self.dW
+    def log_drift(self):
+        # Per period drift of the log-price, with Ito correction
+        return (self.drift - 0.5 * self.volatility ** 2) * self.time.dt
 
-    @property
-    def r_dt(self):
-        drift_per_period = np.exp(self.drift * self.time.dt) - 1.0
-        _r_dt = np.ones(shape=(self.time.steps, self.nb_paths)) * drift_per_period
-        _r_dt[0, :] = 0.0
-        return _r_dt
+    def _generate_block(self, out: np.ndarray, draw: int, offset: int):
 
-    @property
-    def ito_drift(self):
-        # assumes dW is 0.0 on step 0
-        return 0.5 * np.power(self.sigma_dW, 2)
+        # Single draw of the shocks, which becomes our only buffer
+        out[0, :] = 0.0  # no uncertainty at present
+        self.rng.normal(samples=out.shape[0] - 1, paths=out.shape[1], out=out[1:], draw=draw, offset=offset)
 
-    def __generate_gbm(self, nb_paths):
-        self.nb_paths = max(1, int(nb_paths))
-        log_s = np.exp(self.r_dt + self.sigma_dW - self.ito_drift)
-        base_1 = np.cumprod(log_s, axis=0)
-        return pd.DataFrame(base_1 * self.initial_value, index=self.schedule)
+        # Log-increments, computed in place
+        out[1:] *= self.volatility * np.sqrt(self.time.dt)
+        out[1:] += self.log_drift
 
-    def generate(self, nb_paths: int = 1, regenerate: bool = True):
-        if self.paths is None or regenerate or self.nb_paths != nb_paths:
-            self.paths = self.__generate_gbm(nb_paths=nb_paths)
-        return self.paths
+        # Cumulated log-returns, then prices
+        np.cumsum(out, axis=0, out=out)
+        np.exp(out, out=out)
+        out *= self.initial_value
 
     def theoretical_expectation(self, spot_0: float = None, maturity: float = None, drift: float = None):
         spot_0 = self.initial_value if spot_0 is None else spot_0
@@ -83,9 +79,11 @@ class GeometricBrownianMotion(StochasticProcess):
 class GeometricBrownianMotionCandle(GeometricBrownianMotion):
 
     def __init__(self, volatility: float, sampling_rate: int = 10, drift: float = 0.0, initial_value: float = 1.0,
-                 maturity: float = 1.0, time_intervals: int = 365):
+                 maturity: float = 1.0, time_intervals: int = 365, seed: int = 0, dtype=np.float64,
+                 sampling: str = "pseudo", bridge_ordering: bool = False):
         super().__init__(volatility=volatility, drift=drift, initial_value=initial_value,
-                         maturity=maturity, time_intervals=time_intervals)
+                         maturity=maturity, time_intervals=time_intervals, seed=seed, dtype=dtype,
+                         sampling=sampling, bridge_ordering=bridge_ordering)
 
         # How many samples per (output) period
         self.sampling_rate = int(sampling_rate)
@@ -93,18 +91,50 @@ class GeometricBrownianMotionCandle(GeometricBrownianMotion):
         # How many samples per (output) period
         self.time = TimeGenerator(maturity=maturity, intervals=time_intervals * self.sampling_rate)
 
-    def generate(self, nb_paths: int = 1, regenerate: bool = True, rule="1D"):
+    @property
+    def params(self) -> dict:
+        return {**super().params, "sampling_rate": self.sampling_rate}
+
+    def candles(self) -> np.ndarray:
+        """
+        OHLC candles of the generated paths, as a (periods, 4, paths) array.
+
+        Each (output) period groups sampling_rate consecutive samples, the last
+        sample (at maturity) making up a period on its own.
+        """
+        if self.paths is None:
+            self.generate()
+
+        samples = np.asarray(self.paths)
+        nb_samples, nb_paths = samples.shape
+        rate = self.sampling_rate
+        periods = (nb_samples - 1) // rate
+
+        # View as (periods, samples per period, paths): axis reductions for high/low
+        body = samples[:periods * rate].reshape(periods, rate, nb_paths)
+
+        ohlc = np.empty((periods + 1, 4, nb_paths), dtype=samples.dtype)
+        ohlc[:periods, 0] = body[:, 0]
+        np.max(body, axis=1, out=ohlc[:periods, 1])
+        np.min(body, axis=1, out=ohlc[:periods, 2])
+        ohlc[:periods, 3] = body[:, -1]
+        ohlc[periods, :] = samples[-1]
+        return ohlc
+
+    def generate(self, nb_paths: int = 1, regenerate: bool = True, workers: int = None, cache=None,
+                 start: datetime = None, basis=365):
         # Generate the paths according to our GBM methodology
-        super().generate(nb_paths=nb_paths, regenerate=regenerate)
-        df_high_sampling = self.to_datetime_index()
+        super().generate(nb_paths=nb_paths, regenerate=regenerate, workers=workers, cache=cache)
+        ohlc = self.candles()
+        periods, _, nb_paths = ohlc.shape
 
-        # Reference the time origin
-        time_origin = df_high_sampling.index.min()
+        # Opening time of each period
+        start = start if start is not None else datetime.today()
+        idx_dt = [start + timedelta(days=t*basis) for t in self.schedule[::self.sampling_rate]]
 
-        # Group the df for each path (OHLC)
-        # into a dict indexed by path number (as int)
-        paths = {i: df_high_sampling.iloc[:, i].resample(rule, origin=time_origin).ohlc() for i in range(nb_paths)}
-        return paths
+        # One (open, high, low, close) group of columns per path
+        columns = pd.MultiIndex.from_product([range(nb_paths), OHLC_FIELDS])
+        return pd.DataFrame(ohlc.transpose(0, 2, 1).reshape(periods, nb_paths * 4), index=idx_dt, columns=columns)
 
 
 if __name__ == '__main__':
@@ -1,9 +1,10 @@
 import numpy as np
-import pandas as pd
 
-from paths.utils.samples import RandomNumberGenerator1d
 from paths.base import StochasticProcess
 
+# Largest decay (kappa * time) covered by one block of the AR(1) cumulation
+OU_MAX_LOG_DECAY = 30.0
+
 
 class OrnsteinUhlenbeckProcess(StochasticProcess):
     """
@@ -20,51 +21,63 @@ class OrnsteinUhlenbeckProcess(StochasticProcess):
     """
 
     def __init__(self, volatility: float, long_term_mean: float = 1.0, mean_reversion: float = 0.0,
-                 initial_value: float = 1.0, maturity: float = 1.0, time_intervals: int = 365):
+                 initial_value: float = 1.0, maturity: float = 1.0, time_intervals: int = 365, seed: int = 0,
+                 sampling: str = "pseudo", bridge_ordering: bool = False):
         super().__init__(volatility=volatility, initial_value=initial_value,
-                         maturity=maturity, time_intervals=time_intervals)
+                         maturity=maturity, time_intervals=time_intervals, seed=seed,
+                         sampling=sampling, bridge_ordering=bridge_ordering)
 
         # Process Characteristics
         self.long_term_mean = long_term_mean  # annual
         self.mean_reversion = mean_reversion  # annual
 
+    @property
+    def params(self) -> dict:
+        return {**super().params, "long_term_mean": self.long_term_mean, "mean_reversion": self.mean_reversion}
+
     @property
     def effective_std_dev(self):
+        if self.mean_reversion == 0.0:
+            return self.volatility * np.sqrt(self.time.dt)  # Brownian limit
         elasticity = 0.5 / self.mean_reversion * (1.0 - np.exp(-2.0 * self.mean_reversion * self.time.dt))
         return np.sqrt(elasticity * self.volatility ** 2.0)
 
-    def __generate_ou(self, nb_paths):
+    @property
+    def autoregression(self):
+        # Exact AR(1) coefficient over one time step
+        return np.exp(-self.mean_reversion * self.time.dt)
 
-        # Reference for future check
-        self.nb_paths = nb_paths
+    def _generate_block(self, out: np.ndarray, draw: int, offset: int):
 
         # Reference these...
-        nb_time_steps = self.time.steps
-        kappa = self.mean_reversion
-        dt = self.time.dt
+        nb_time_steps, nb_paths = out.shape
         theta = self.long_term_mean
+        a = self.autoregression
 
-        # Random normal generation
-        # epsilon = np.random.normal(0, 1, (nb_paths, nb_time_steps - 1))
-        epsilon = RandomNumberGenerator1d.normal(samples=nb_time_steps-1, paths=nb_paths).T
-
-        # Initialization
-        _ou = np.zeros((nb_paths, nb_time_steps))
-        _ou[:, 0] = self.initial_value
+        # Generated directly in the (steps, paths) layout: deviations from the long term mean
+        _ou = out
+        _ou[0, :] = self.initial_value - theta
 
         # Randomness
-        _ou[:, 1:] = np.kron(self.effective_std_dev, np.ones((nb_paths, 1))) * epsilon
-
-        for i in range(1, _ou.shape[1]):
-            _ou[:, i] += theta * (1 - np.exp(-kappa * dt))
-            _ou[:, i] += np.exp(-kappa * dt) * _ou[:, i - 1]
-
-        return pd.DataFrame(np.transpose(_ou), index=self.schedule)
-
-    def generate(self, nb_paths: int = 1, regenerate: bool = True):
-        if self.paths is None or regenerate or self.nb_paths != nb_paths:
-            self.paths = self.__generate_ou(nb_paths=nb_paths)
-        return self.paths
+        self.rng.normal(samples=nb_time_steps-1, paths=nb_paths, out=_ou[1:, :], draw=draw, offset=offset)
+        _ou[1:, :] *= self.effective_std_dev
+
+        # y(i) = a * y(i-1) + eps(i), i.e. y(j) = a^j * (y(0) + cumsum(eps(i) / a^i))
+        # computed by blocks short enough for 1 / a^i not to overflow
+        kappa_dt = self.mean_reversion * self.time.dt
+        block = nb_time_steps if kappa_dt == 0.0 else max(1, int(OU_MAX_LOG_DECAY / kappa_dt))
+        powers = np.power(a, np.arange(1, min(block, nb_time_steps) + 1))[:, None]
+
+        for start in range(1, nb_time_steps, block):
+            stop = min(start + block, nb_time_steps)
+            p = powers[:stop - start]
+            y = _ou[start:stop]
+            y /= p
+            np.cumsum(y, axis=0, out=y)
+            y += _ou[start - 1]
+            y *= p
+
+        _ou += theta
 
     def theoretical_expectation(self, spot_0: float = None, maturity: float = None,
                                 mr: float = None, lt_mean: float = None):
@@ -0,0 +1,173 @@
+import json
+import os
+from datetime import datetime
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+NS_PER_DAY = 24 * 60 * 60 * 1_000_000_000
+
+
+class PathStore(object):
+    """
+    Monte Carlo paths stored on disk, opened lazily.
+
+    A store is made of files sharing the same stem:
+
+    * <stem>.npy: the (steps, paths) matrix, in Fortran order so that each path
+      (and each block of paths) is contiguous on disk
+    * <stem>.json: the header (process class and parameters, seed, draw,
+      time grid and datetime origin)
+    * <stem>.index.npy: the time index as int64 epoch nanoseconds, only for
+      stores converted from existing datasets (see from_csv)
+
+    The matrix is memory-mapped: nothing is read until paths are accessed.
+
+    For example, to generate 1,000,000 paths without holding them in memory:
+
+    gbm = GeometricBrownianMotion(volatility=0.25, maturity=5.0, time_intervals=1825)
+    store = gbm.write("gbm_1m", nb_paths=1_000_000)
+    feed = MonteCarloDataFeed(PathStore("gbm_1m"), columns=[42, ])
+
+    """
+
+    def __init__(self, path: str, mode: str = "r"):
+        self.stem = self.__stem(path)
+        self.mode = mode
+
+        with open(self.stem + ".json", "r") as f:
+            self.meta: dict = json.load(f)
+
+        self.paths: np.ndarray = np.load(self.stem + ".npy", mmap_mode=mode)
+        self.__index_ns: Optional[np.ndarray] = None
+
+    @staticmethod
+    def __stem(path: str) -> str:
+        path = os.fspath(path)
+        for ext in (".index.npy", ".npy", ".json"):
+            if path.endswith(ext):
+                return path[:-len(ext)]
+        return path
+
+    @classmethod
+    def exists(cls, path: str) -> bool:
+        stem = cls.__stem(path)
+        return os.path.isfile(stem + ".json") and os.path.isfile(stem + ".npy")
+
+    @classmethod
+    def create(cls, path: str, shape: tuple, dtype, meta: dict, index_ns: np.ndarray = None):
+        """
+        Allocates the matrix on disk and writes the header (opened read/write).
+        """
+        stem = cls.__stem(path)
+        meta = dict(meta, shape=list(shape), dtype=np.dtype(dtype).name)
+
+        with open(stem + ".json", "w") as f:
+            json.dump(meta, f, indent=2)
+
+        if index_ns is not None:
+            np.save(stem + ".index.npy", np.asarray(index_ns, dtype=np.int64))
+
+        mm = np.lib.format.open_memmap(stem + ".npy", mode="w+", dtype=dtype, shape=tuple(shape), fortran_order=True)
+        del mm  # allocated on disk, reopened below
+
+        return cls(stem, mode="r+")
+
+    @property
+    def shape(self):
+        return self.paths.shape
+
+    @property
+    def nb_steps(self):
+        return self.shape[0]
+
+    @property
+    def nb_paths(self):
+        return self.shape[1]
+
+    @property
+    def schedule(self) -> np.ndarray:
+        return np.asarray(self.meta["schedule"])
+
+    @property
+    def index_ns(self) -> np.ndarray:
+        """
+        Time index as int64 epoch nanoseconds (same dates as to_datetime_index).
+        """
+        if self.__index_ns is None and "start" not in self.meta:
+            self.__index_ns = np.load(self.stem + ".index.npy")
+
+        if self.__index_ns is None:
+            start = np.datetime64(datetime.fromisoformat(self.meta["start"]), "ns").astype(np.int64)
+            offsets = np.round(self.schedule * self.meta["basis"] * NS_PER_DAY / 1000).astype(np.int64) * 1000
+            self.__index_ns = start + offsets
+        return self.__index_ns
+
+    @property
+    def index(self) -> pd.DatetimeIndex:
+        return pd.to_datetime(self.index_ns)
+
+    def positions(self, columns) -> list:
+        """
+        Positions of the given column labels in the matrix (labels are
+        positions, unless the store was converted from a labelled dataset).
+        """
+        if "columns" not in self.meta:
+            return list(columns)
+        lookup = {c: i for i, c in enumerate(self.meta["columns"])}
+        return [lookup[c] for c in columns]
+
+    def flush(self):
+        if isinstance(self.paths, np.memmap):
+            self.paths.flush()
+
+    def iter_blocks(self, block_paths: int = 1024):
+        """
+        Yields (first path, block) with blocks of paths read from disk.
+        """
+        for start in range(0, self.nb_paths, block_paths):
+            yield start, np.asarray(self.paths[:, start:start + block_paths])
+
+    def to_frame(self, columns=None) -> pd.DataFrame:
+        """
+        Loads the requested paths (all by default) with their datetime index.
+        """
+        columns = self.meta.get("columns", list(range(self.nb_paths))) if columns is None else list(columns)
+        return pd.DataFrame(self.paths[:, self.positions(columns)], index=self.index, columns=columns)
+
+    @classmethod
+    def from_csv(cls, csv_path: str, path: str = None, dtype=np.float64, chunk_rows: int = 10_000):
+        """
+        One-shot conversion of a CSV dataset (a "Date" column, then one column
+        per path, named by integers) into a store. The CSV is read by chunks
+        of rows, so the conversion does not need to hold it in memory.
+        """
+        path = path if path is not None else os.path.splitext(os.fspath(csv_path))[0]
+
+        # Layout of the dataset
+        labels = [c for c in pd.read_csv(csv_path, nrows=0).columns if c != "Date"]
+        with open(csv_path, "r") as f:
+            nb_steps = sum(1 for _ in f) - 1  # minus the header
+
+        meta = {"source": os.path.abspath(csv_path), "columns": [int(c) for c in labels]}
+        index_ns = np.empty(nb_steps, dtype=np.int64)
+        store = cls.create(path, shape=(nb_steps, len(labels)), dtype=dtype, meta=meta)
+
+        row = 0
+        for chunk in pd.read_csv(csv_path, chunksize=chunk_rows):
+            n = len(chunk)
+            index_ns[row:row + n] = np.asarray(pd.to_datetime(chunk["Date"]), dtype="datetime64[ns]").astype(np.int64)
+            store.paths[row:row + n, :] = chunk[labels].to_numpy(dtype=dtype)
+            row += n
+
+        np.save(store.stem + ".index.npy", index_ns)
+        store.flush()
+        return cls(store.stem)
+
+    def __getstate__(self):
+        # Reopened from disk when unpickled (e.g. in pool workers)
+        return {"stem": self.stem, "mode": "r"}
+
+    def __setstate__(self, state):
+        self.__init__(state["stem"], mode=state["mode"])
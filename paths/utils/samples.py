@@ -1,15 +1,195 @@
+import warnings
+from functools import lru_cache
+from typing import List, Tuple
+
 import numpy as np
 
+# Ways of drawing the numbers (see RandomNumberGenerator1d)
+SAMPLING_METHODS = ("pseudo", "antithetic", "sobol")
+
+# Largest dimension (samples per path) of the Sobol sequences
+SOBOL_MAX_DIM = 21201
+
+
+@lru_cache(maxsize=32)
+def bridge_plan(samples: int) -> tuple:
+    """
+    Order in which a Brownian bridge builds a walk of samples unit steps:
+    the end point first, then mid points by levels of bisection, as a tuple of
+    (mid, left, right, left weight, right weight, std) arrays, one per level.
+    """
+    levels, intervals = [], [(0, samples)]
+    while intervals:
+        level, intervals = [], [(l, r) for l, r in intervals if r - l > 1]
+        for l, r in intervals:
+            m = (l + r) // 2
+            level.append((m, l, r, (r - m) / (r - l), (m - l) / (r - l), np.sqrt((m - l) * (r - m) / (r - l))))
+        if level:
+            mid, left, right, wl, wr, std = (np.array(c) for c in zip(*level))
+            levels.append((mid, left, right, wl[:, None], wr[:, None], std[:, None]))
+        intervals = [i for l, r in intervals for i in ((l, (l + r) // 2), ((l + r) // 2, r))]
+    return tuple(levels)
+
+
+def bridge_increments(z: np.ndarray) -> np.ndarray:
+    """
+    Increments of Brownian walks (unit time steps) built from the normals z,
+    shaped (samples, paths), by Brownian bridge: z[0] drives the end point,
+    the next ones the mid points, down to the finest details. The increments
+    are still independent standard normals, but the first numbers (the best
+    distributed ones, for quasi-random sequences) carry most of the variance.
+    """
+    samples, paths = z.shape
+    walk = np.zeros((samples + 1, paths), dtype=z.dtype)
+    walk[samples] = np.sqrt(samples) * z[0]
+
+    j = 1
+    for mid, left, right, wl, wr, std in bridge_plan(samples):
+        n = len(mid)
+        walk[mid] = wl * walk[left] + wr * walk[right] + std * z[j:j + n]
+        j += n
+    return np.diff(walk, axis=0)
+
 
 class RandomNumberGenerator1d(object):
+    """
+    Random numbers drawn from explicit numpy Generators (no global state).
+
+    The paths are split into blocks of block_size paths, each block drawing
+    from its own child stream of the SeedSequence, keyed by (draw, block):
+    a block can be regenerated on its own and results do not depend on how
+    blocks are scheduled. Within a block, each path consumes consecutive
+    numbers of the stream, so the first k paths are the same for any number
+    of paths.
+
+    Variance reduction, by sampling method:
+
+    * pseudo: plain pseudo-random numbers
+    * antithetic: paths come in pairs (2i, 2i + 1), the second one drawn
+      from the opposite numbers (-z for normals, 1 - u for uniforms)
+    * sobol: scrambled Sobol sequence over the paths, one dimension per
+      sample (mapped through the inverse normal CDF), requires scipy
+
+    With bridge_ordering, the normals of each path build its increments by
+    Brownian bridge (see bridge_increments), which is what makes Sobol
+    sequences effective over long time grids.
+
+    For example, to draw a (365, 1000) matrix of standard normals:
+
+    rng = RandomNumberGenerator1d(seed=40)
+    eps = rng.normal(samples=365, paths=1000)
+
+    """
+
+    def __init__(self, seed: int = None, block_size: int = 1024, bit_generator=np.random.PCG64DXSM,
+                 sampling: str = "pseudo", bridge_ordering: bool = False):
+        self.seed_sequence = np.random.SeedSequence(seed)
+        self.block_size: int = max(1, int(block_size))
+        self.bit_generator = bit_generator
+
+        # Variance reduction
+        assert sampling in SAMPLING_METHODS, f"sampling must be one of {SAMPLING_METHODS}"
+        self.sampling: str = sampling
+        self.bridge_ordering: bool = bool(bridge_ordering)
+
+        # Matrices drawn so far (successive draws are independent)
+        self.draws: int = 0
+
+    def generator(self, block: int, draw: int) -> np.random.Generator:
+        """
+        Generator of the child stream for a given draw and block of paths.
+        """
+        seq = np.random.SeedSequence(self.seed_sequence.entropy, spawn_key=(draw, block))
+        return np.random.Generator(self.bit_generator(seq))
+
+    def next_draw(self) -> int:
+        """
+        Reserves the key of a new draw (successive draws are independent).
+        """
+        draw = self.draws
+        self.draws += 1
+        return draw
+
+    def blocks(self, paths: int, offset: int = 0) -> List[Tuple[int, int, int]]:
+        """
+        Blocks of paths as (block, first path, last path + 1), for the paths
+        offset to offset + paths (offset must be at the start of a block).
+        """
+        size = self.block_size
+        assert offset % size == 0, "offset must be a multiple of the block size"
+        stop = offset + paths
+        return [(start // size, start, min(start + size, stop)) for start in range(offset, stop, size)]
+
+    def __draw(self, method: str, samples: int, paths: int, dtype,
+               out: np.ndarray = None, draw: int = None, offset: int = 0) -> np.ndarray:
+        out = np.empty((samples, paths), dtype=dtype) if out is None else out
+        assert out.shape == (samples, paths), "out must be shaped (samples, paths)"
+
+        draw = self.next_draw() if draw is None else draw
+
+        for block, start, stop in self.blocks(paths, offset=offset):
+            values = self.__block(method, samples, block, start, stop, draw, out.dtype)
+            if self.bridge_ordering and method == "standard_normal":
+                out[:, start - offset:stop - offset] = bridge_increments(values.T)
+            else:
+                out[:, start - offset:stop - offset] = values.T
+        return out
+
+    def __block(self, method: str, samples: int, block: int, start: int, stop: int, draw: int, dtype):
+        # Numbers of the paths start to stop, shaped (paths, samples)
+        paths = stop - start
+
+        if self.sampling == "sobol":
+            u = self.__sobol(samples, start, paths, draw)
+            if method == "random":
+                return u
+            from scipy.special import ndtri
+            return ndtri(u)
+
+        gen = self.generator(block, draw)
+        if self.sampling == "pseudo":
+            return getattr(gen, method)(size=(paths, samples), dtype=dtype)
+
+        # Antithetic pairs, within the block
+        half = getattr(gen, method)(size=((paths + 1) // 2, samples), dtype=dtype)
+        values = np.empty((paths, samples), dtype=dtype)
+        values[0::2] = half
+        values[1::2] = -half[:paths // 2] if method == "standard_normal" else 1.0 - half[:paths // 2]
+        return values
+
+    def __sobol(self, samples: int, start: int, paths: int, draw: int) -> np.ndarray:
+        try:
+            from scipy.stats import qmc
+        except ImportError:
+            raise ImportError("Sobol sampling requires scipy (pip install scipy).")
+        assert samples <= SOBOL_MAX_DIM, f"Sobol sequences are limited to {SOBOL_MAX_DIM} samples per path"
+
+        # Same scrambling for all the blocks of a draw, each block being a range of the sequence
+        engine = qmc.Sobol(d=samples, scramble=True, seed=self.generator(0, draw))
+        if start > 0:
+            engine.fast_forward(start)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", UserWarning)  # balance warning, for sizes other than powers of 2
+            u = engine.random(paths)
+
+        # Strictly within (0, 1) for the inverse CDF
+        return np.clip(u, np.finfo(np.float64).tiny, 1.0 - np.finfo(np.float64).epsneg)
 
-    def __init__(self):
-        raise NotImplementedError("Static class.")
+    def uniform(self, samples: int, paths: int = 1, dtype=np.float64,
+                out: np.ndarray = None, draw: int = None, offset: int = 0):
+        return self.__draw("random", samples, paths, dtype, out, draw, offset)
 
-    @classmethod
-    def uniform(cls, samples: int, paths: int = 1):
-        return np.random.random((samples, paths))
+    def normal(self, samples: int, paths: int = 1, mean: float = 0.0, std: float = 1.0,
+               dtype=np.float64, out: np.ndarray = None, draw: int = None, offset: int = 0):
+        """
+        Normal samples shaped (samples, paths).
 
-    @classmethod
-    def normal(cls, samples: int, paths: int = 1, mean: float = 0.0, std: float = 1.0):
-        return np.random.normal(mean, std, size=(samples, paths))
+        By default, a new draw of the paths 0 to paths. With draw and offset,
+        the paths offset to offset + paths of an existing draw (e.g. one block).
+        """
+        out = self.__draw("standard_normal", samples, paths, dtype, out, draw, offset)
+        if std != 1.0:
+            out *= std
+        if mean != 0.0:
+            out += mean
+        return out
@@ -2,4 +2,5 @@ from src.core.context import *
 from src.core.feed import *
 from src.core.strategy import *
 from src.core.analytics import AnalyticsEngine
-from src.core.execution import ExecutionEngine
\ No newline at end of file
+from src.core.execution import ExecutionEngine
+from src.core.panel import SummaryPanel
\ No newline at end of file
@@ -1,14 +1,108 @@
+import numpy as np
 import pandas as pd
 
 from src.core.execution import ExecutionEngine
+from src.core.panel import SummaryPanel
+from src.core.stats import RunningMoments, P2Quantile
 from src.core.strategy.observer import StrategyObserver
 
 
+class ControlVariateEstimate(object):
+    """
+    Monte Carlo mean of an output, adjusted with a control of known mean.
+
+    The output is regressed on the control (e.g. the terminal value of the
+    underlying, whose expectation is known in closed form), and the control's
+    sampling error is removed: estimate = mean(Y) - beta * (mean(X) - E[X]).
+    """
+
+    def __init__(self, samples: np.ndarray, control: np.ndarray, control_mean: float):
+        samples = np.asarray(samples, dtype=np.float64)
+        control = np.asarray(control, dtype=np.float64)
+        self.nb_paths = len(samples)
+
+        # Regression coefficient (none if the control does not vary)
+        var_x = control.var(ddof=1)
+        cov_xy = np.cov(control, samples, ddof=1)[0, 1]
+        self.beta = cov_xy / var_x if var_x > 0.0 else 0.0
+
+        # Adjusted samples
+        adjusted = samples - self.beta * (control - control_mean)
+
+        self.naive_estimate = samples.mean()
+        self.naive_std_error = samples.std(ddof=1) / np.sqrt(self.nb_paths)
+        self.estimate = adjusted.mean()
+        self.std_error = adjusted.std(ddof=1) / np.sqrt(self.nb_paths)
+
+    @property
+    def variance_reduction(self) -> float:
+        """
+        Variance of the naive estimator over that of the adjusted one, i.e.
+        how many times fewer paths reach the same precision.
+        """
+        if self.std_error == 0.0:
+            return 1.0 if self.naive_std_error == 0.0 else np.inf
+        return (self.naive_std_error / self.std_error) ** 2
+
+    def to_dict(self) -> dict:
+        return {"estimate": self.estimate,
+                "std_error": self.std_error,
+                "naive_estimate": self.naive_estimate,
+                "naive_std_error": self.naive_std_error,
+                "beta": self.beta,
+                "variance_reduction": self.variance_reduction,
+                "nb_paths": self.nb_paths}
+
+
+def cppi_control_variates(ptf_value: np.ndarray, protection: np.ndarray, price: np.ndarray,
+                          expectation: float) -> pd.DataFrame:
+    """
+    Control variate estimates of the CPPI terminal value and protection gap
+    (shortfall of the portfolio under the protection level), from their
+    terminal values over the paths, the underlying price being the control.
+
+    :param expectation: known expectation of the underlying terminal price
+    :return: one row per output, one column per field of the estimates
+    """
+    gap = np.maximum(protection - ptf_value, 0.0)
+    estimates = {"terminal_value": ControlVariateEstimate(ptf_value, price, expectation),
+                 "protection_gap": ControlVariateEstimate(gap, price, expectation)}
+    return pd.DataFrame({k: e.to_dict() for k, e in estimates.items()}).T
+
+
 class AnalyticsEngine(StrategyObserver):
+    """
+    Collects the agents of a Monte Carlo backtest.
+
+    By default, every agent is kept (see summarize). In online mode, each
+    agent only updates running statistics across paths when stored, then is
+    dropped: memory grows with the number of ticks, plus a few terminal values
+    per path, instead of paths x ticks. All paths must share the same dates.
 
-    def __init__(self):
+    For example:
+
+    analytics = AnalyticsEngine(online=True, quantiles=(0.01, 0.5, 0.99))
+    BacktestRunner(df_paths, factory, analytics=analytics).run()
+    analytics.statistics()
+
+    """
+
+    def __init__(self, online: bool = False, quantiles=(0.05, 0.5, 0.95)):
         self.realizations = []  # realizations of the same agent
 
+        # Online mode: running statistics only (initialized by the first path)
+        self.online: bool = online
+        self.quantiles = tuple(quantiles)
+        self.nb_paths: int = 0
+        self.index = None
+        self.moments = None  # normalized portfolio and underlying, per tick
+        self.sketches = None  # quantiles of the normalized portfolio, per tick
+        self.breaches = None  # paths under their protection level, per tick
+        self.breached_paths: int = 0  # paths under their protection level at least once
+        self.max_drawdowns = RunningMoments(1)
+        self.worst_drawdown: float = 0.0
+        self.terminals = {"ptf_value": [], "protection": [], "price": []}
+
     def initialize(self, agent: ExecutionEngine):
         # strategy.subscribe(self)
         pass
@@ -17,7 +111,114 @@ class AnalyticsEngine(StrategyObserver):
         pass
 
     def store(self, agent: ExecutionEngine):
-        self.realizations.append(agent)
+        if self.online:
+            self.__accumulate(agent)
+        else:
+            self.realizations.append(agent)
+
+    def __accumulate(self, agent: ExecutionEngine):
+        strategy = agent.strategy
+        record = strategy.record
+        ptf = record.column("ptf_value")
+        prot = record.column("protection")
+        px = record.column("price")
+
+        # First path: dates and accumulators
+        if self.index is None:
+            idx = record.timestamps.copy()
+            self.index = pd.to_datetime(idx, unit="ns") if strategy.epoch_ns else pd.DatetimeIndex(idx)
+            size = len(idx)
+            self.moments = {"CPPI": RunningMoments(size), "Undl": RunningMoments(size)}
+            self.sketches = [P2Quantile(q, size) for q in self.quantiles]
+            self.breaches = np.zeros(size, dtype=np.int64)
+        assert len(ptf) == len(self.index), "all paths must share the same dates"
+
+        # Per tick
+        cppi = ptf / ptf[0]
+        self.moments["CPPI"].update(cppi)
+        self.moments["Undl"].update(px / px[0])
+        for sketch in self.sketches:
+            sketch.update(cppi)
+        breach = ptf < prot
+        self.breaches += breach
+
+        # Per path
+        self.nb_paths += 1
+        self.breached_paths += bool(breach.any())
+        drawdown = np.max(1.0 - ptf / np.maximum.accumulate(ptf)).item()
+        self.max_drawdowns.update(np.array([drawdown]))
+        self.worst_drawdown = max(self.worst_drawdown, drawdown)
+        for field, values in (("ptf_value", ptf), ("protection", prot), ("price", px)):
+            self.terminals[field].append(values[-1].item())
+
+    def __online(self) -> "AnalyticsEngine":
+        # Running statistics, from the stored agents if need be
+        if self.online:
+            return self
+        engine = AnalyticsEngine(online=True, quantiles=self.quantiles)
+        for agent in self.realizations:
+            engine.store(agent)
+        return engine
+
+    def statistics(self) -> pd.DataFrame:
+        """
+        Cross-path statistics per tick: mean and standard deviation of the
+        normalized portfolio value (quantiles too, approximate) and underlying,
+        and the share of paths under their protection level.
+        """
+        engine = self.__online()
+        if engine.index is None:
+            raise ValueError("No path stored yet.")
+
+        cppi, undl = engine.moments["CPPI"], engine.moments["Undl"]
+        columns = {"CPPI mean": cppi.mean, "CPPI std": cppi.std}
+        for sketch in engine.sketches:
+            columns[f"CPPI q{sketch.probability:g}"] = sketch.value
+        columns.update({"Undl mean": undl.mean, "Undl std": undl.std,
+                        "Breach": engine.breaches / engine.nb_paths})
+        return pd.DataFrame(columns, index=engine.index)
+
+    def path_statistics(self) -> dict:
+        """
+        Statistics of the paths as a whole: probability of ever breaching the
+        protection level and maximum drawdown of the portfolio.
+        """
+        engine = self.__online()
+        return {"nb_paths": engine.nb_paths,
+                "breach_probability": engine.breached_paths / max(1, engine.nb_paths),
+                "max_drawdown_mean": engine.max_drawdowns.mean.item(),
+                "max_drawdown_std": engine.max_drawdowns.std.item(),
+                "max_drawdown_worst": engine.worst_drawdown}
+
+    def panel(self) -> SummaryPanel:
+        """
+        Track records of all the stored agents as a single (fields, ticks, paths) panel.
+        """
+        if self.online:
+            raise ValueError("Agents are not kept in online mode, see statistics.")
+        return SummaryPanel.from_agents(self.realizations)
+
+    def terminal(self, field: str) -> np.ndarray:
+        """
+        Last value of a track record field, for every realization.
+        """
+        if self.online:
+            return np.array(self.terminals[field])
+        return np.array([agent.strategy.record.last(field) for agent in self.realizations])
+
+    def control_variates(self, expectation: float) -> pd.DataFrame:
+        """
+        CPPI terminal value and protection gap, estimated with the underlying
+        terminal price as control variate.
+
+        For example, on GBM paths:
+
+        analytics.control_variates(expectation=gbm.theoretical_expectation())
+
+        :param expectation: known expectation of the underlying terminal price
+        """
+        return cppi_control_variates(self.terminal("ptf_value"), self.terminal("protection"),
+                                     self.terminal("price"), expectation)
 
     @classmethod
     def summarize(cls, agent: ExecutionEngine):
@@ -25,21 +226,17 @@ class AnalyticsEngine(StrategyObserver):
         # Get ref to strategy
         strategy = agent.strategy
 
-        # Assume the portfolio history contains
-        # all dates observed during the simulation
-        ptf = list(strategy.ptf_value_history.values())
-        idx = list(strategy.ptf_value_history.keys())
+        # Track record: one row per observed date
+        record = strategy.record
+        idx = record.timestamps
+        if strategy.epoch_ns:
+            idx = pd.to_datetime(idx, unit="ns")  # datetimes only for reporting
 
-        # Price of the underlying asset
-        px = list(strategy.asset_price.values())
+        # Portfolio value, protection level and underlying price (views)
+        ptf = record.column("ptf_value")
+        prot = record.column("protection")
+        px = record.column("price")
 
-        # Protection level of the CPPI
-        prot = list(strategy.ptf_protected_value.values())
-
-        df = pd.DataFrame({"CPPI": ptf, "Protection": prot, "Undl": px}, index=idx)
-        ts_init = df.index.min()
-        df["Protection"] = df["Protection"] / df["CPPI"][ts_init]
-        df["CPPI"] = df["CPPI"] / df["CPPI"][ts_init]
-        df["Undl"] = df["Undl"] / df["Undl"][ts_init]
+        # Normalized by the initial values
+        df = pd.DataFrame({"CPPI": ptf / ptf[0], "Protection": prot / ptf[0], "Undl": px / px[0]}, index=idx)
         return df
-
@@ -1,3 +1,5 @@
 from src.core.context.engine import ContextualEngine
+from src.core.context.runner import BacktestRunner
+from src.core.context.profiling import EngineProfile
 from src.core.context.schedule import TimeKeeper
 from src.core.context.exceptions import *
@@ -1,6 +1,10 @@
+import cProfile
+import time
+
 from src.core.feed.data import DataFeed
 from src.core.execution import ExecutionEngine
 from src.core.analytics import AnalyticsEngine
+from src.core.context.profiling import EngineProfile, TimedObserver
 
 
 class ContextualEngine(object):
@@ -12,13 +16,17 @@ class ContextualEngine(object):
     * The analytics that will look at the performance of the strategy
     * The execution manager to handle trading
 
+    With a profile, the time spent in each component is recorded into it
+    (see EngineProfile).
+
     """
 
     def __init__(self, data: DataFeed, agent: ExecutionEngine,
-                 analytics: AnalyticsEngine, verbose: bool = False):
+                 analytics: AnalyticsEngine, verbose: bool = False, profile: EngineProfile = None):
         #
         # Settings
         self.verbose: bool = verbose
+        self.profile: EngineProfile = profile
 
         # Data Feed: to provide the input data
         self.data: DataFeed = data
@@ -48,6 +56,9 @@ class ContextualEngine(object):
 
     def start(self, ):
 
+        if self.profile is not None:
+            return self.__start_profiled()
+
         # Start the flow of data
         self.data.start()
 
@@ -56,9 +67,41 @@ class ContextualEngine(object):
 
         print(f"Backtest ended successfully.")
 
+    def __start_profiled(self):
+        profile = self.profile
+        profiler = cProfile.Profile() if profile.sampled() else None
+
+        # Observers timed for the duration of the backtest (ticks counted by the feed if it can)
+        observers = self.data.observers
+        feed_counts = self.data.tick_count is not None
+        self.data.observers = [TimedObserver(o, profile, count_ticks=(i == 0 and not feed_counts))
+                               for i, o in enumerate(observers)]
+        try:
+            st_time = time.perf_counter()
+            if profiler is not None:
+                profiler.runcall(self.data.start)
+            else:
+                self.data.start()
+            profile.add("feed.start", time.perf_counter() - st_time)
+        finally:
+            self.data.observers = observers
+
+        if feed_counts:
+            profile.ticks += self.data.tick_count
+
+        st_time = time.perf_counter()
+        self.analytics.store(self.agent)
+        profile.add("analytics.store", time.perf_counter() - st_time)
+
+        profile.paths += 1
+        if profiler is not None:
+            profile.capture(profiler)
+
+        print(f"Backtest ended successfully.")
+
 
 def start_bt(bt):
     try:
         bt.start()
     except Exception as exc:
-        print(exc)
\ No newline at end of file
+        print(exc)
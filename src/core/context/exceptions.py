@@ -1,5 +1,16 @@
 class EarlyTerminationException(Exception):
-    pass
+    """
+    Raised by a strategy with nothing to do until a given date.
+
+    The feed may then call fast_forward(timestamps, prices) with the data up
+    to that date (excluded): the strategy records what it can analytically
+    and returns the number of ticks it consumed.
+    """
+
+    def __init__(self, message: str = "", until=None, fast_forward=None):
+        super().__init__(message)
+        self.until = until
+        self.fast_forward = fast_forward
 
 
 class MaturityException(Exception):
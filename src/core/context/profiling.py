@@ -0,0 +1,181 @@
+import cProfile
+import pstats
+import time
+from typing import Dict, List
+
+import pandas as pd
+
+from src.core.context.exceptions import EarlyTerminationException
+from src.core.feed.data import DataFeedObserver
+
+
+class EngineProfile(object):
+    """
+    Time spent in the components of backtests, accumulated over paths.
+
+    Passed to ContextualEngine (or BacktestRunner), it records the ticks, the
+    time of DataFeed.start, of each observer's notifications and of
+    AnalyticsEngine.store, and runs one path out of sample_every under
+    cProfile. Profiles are plain data: those of pool workers are merged into
+    the parent's. Without a profile, engines are not instrumented at all.
+
+    For example:
+
+    profile = EngineProfile(sample_every=100)
+    BacktestRunner(df_paths, factory, profile=profile).run()
+    print(profile.report())
+    profile.stats().sort_stats("cumulative").print_stats(20)
+
+    """
+
+    def __init__(self, sample_every: int = None, first_path: int = 0):
+        self.sample_every = sample_every
+
+        # Index of the first path in the whole run (e.g. start of a chunk), for sampling
+        self.first_path: int = first_path
+
+        # Counters
+        self.paths: int = 0
+        self.ticks: int = 0
+        self.timings: Dict[str, List] = {}  # component -> [seconds, calls]
+
+        # Raw cProfile stats of the sampled paths
+        self.profiles: List[dict] = []
+
+    def empty(self, first_path: int = 0) -> "EngineProfile":
+        """
+        New profile with the same settings (e.g. for a chunk of paths, in a
+        pool worker, starting at path first_path).
+        """
+        return EngineProfile(sample_every=self.sample_every, first_path=first_path)
+
+    def add(self, component: str, seconds: float, calls: int = 1):
+        timing = self.timings.setdefault(component, [0.0, 0])
+        timing[0] += seconds
+        timing[1] += calls
+
+    def sampled(self) -> bool:
+        """
+        Whether the next path runs under cProfile (one path out of
+        sample_every, by index in the whole run).
+        """
+        return bool(self.sample_every) and (self.first_path + self.paths) % self.sample_every == 0
+
+    def capture(self, profiler: cProfile.Profile):
+        profiler.create_stats()
+        self.profiles.append(profiler.stats)
+
+    def merge(self, other: "EngineProfile") -> "EngineProfile":
+        self.paths += other.paths
+        self.ticks += other.ticks
+        for component, (seconds, calls) in other.timings.items():
+            self.add(component, seconds, calls)
+        self.profiles += other.profiles
+        return self
+
+    def report(self) -> pd.DataFrame:
+        """
+        Time per component: total, number of calls, per call and share of the
+        feed time. The feed's own time (data handling and dispatch) is the
+        time of DataFeed.start not spent in the observers.
+        """
+        timings = {k: list(v) for k, v in self.timings.items()}
+        feed, _ = timings.get("feed.start", [0.0, 0])
+        observers = sum(s for k, (s, _) in timings.items() if k.startswith("observer."))
+        timings["feed.own"] = [feed - observers, self.ticks]
+
+        df = pd.DataFrame.from_dict(timings, orient="index", columns=["seconds", "calls"])
+        df["per_call"] = df["seconds"] / df["calls"].clip(lower=1)
+        df["share"] = df["seconds"] / feed if feed > 0.0 else float("nan")
+        return df.sort_index()
+
+    def to_dict(self) -> dict:
+        return {"paths": self.paths,
+                "ticks": self.ticks,
+                "profiled_paths": len(self.profiles),
+                "timings": self.report().to_dict(orient="index")}
+
+    def stats(self) -> pstats.Stats:
+        """
+        cProfile statistics of the sampled paths, all merged.
+        """
+        if not self.profiles:
+            raise ValueError("No path was profiled (see sample_every).")
+        stats = pstats.Stats(_RawStats(self.profiles[0]))
+        for raw in self.profiles[1:]:
+            stats.add(_RawStats(raw))
+        return stats
+
+
+class _RawStats(object):
+    # What pstats.Stats expects from a profiler
+    def __init__(self, stats: dict):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+
+class TimedObserver(DataFeedObserver):
+    """
+    Wraps a data feed observer to time its notifications (and count the
+    ticks, for one of the observers of a feed that does not count them).
+
+    A notification that raises is still timed and counted. If the observer
+    asks to fast-forward, the time of its fast_forward callback is added to
+    its own, one call per tick consumed.
+    """
+
+    def __init__(self, observer: DataFeedObserver, profile: EngineProfile,
+                 name: str = None, count_ticks: bool = False):
+        self.observer = observer
+        self.profile = profile
+        self.name = name if name is not None else f"observer.{type(observer).__name__}"
+        self.count_ticks: bool = count_ticks
+
+    def upon_notification(self, feed, *args, **kwargs):
+        st_time = time.perf_counter()
+        try:
+            self.observer.upon_notification(feed, *args, **kwargs)
+        except EarlyTerminationException as exc:
+            self.__time_fast_forward(exc)
+            raise
+        finally:
+            self.profile.add(self.name, time.perf_counter() - st_time)
+            self.profile.ticks += self.count_ticks
+
+    def __time_fast_forward(self, exc: EarlyTerminationException):
+        callback = exc.fast_forward
+        if callback is None:
+            return
+        profile, name = self.profile, self.name
+
+        def timed_fast_forward(*args, **kwargs):
+            st_time = time.perf_counter()
+            consumed = 0
+            try:
+                consumed = callback(*args, **kwargs)
+                return consumed
+            finally:
+                profile.add(name, time.perf_counter() - st_time, calls=consumed)
+        exc.fast_forward = timed_fast_forward
+
+    def tick_handler(self, feed):
+        handler = self.observer.tick_handler(feed)
+        profile = self.profile
+        timing = profile.timings.setdefault(self.name, [0.0, 0])
+        perf_counter = time.perf_counter
+        count = int(self.count_ticks)
+
+        def timed_handler(tick):
+            st_time = perf_counter()
+            try:
+                handler(tick)
+            except EarlyTerminationException as exc:
+                self.__time_fast_forward(exc)
+                raise
+            finally:
+                timing[0] += perf_counter() - st_time
+                timing[1] += 1
+                profile.ticks += count
+        return timed_handler
@@ -0,0 +1,127 @@
+import math
+from multiprocessing import Pool, cpu_count
+from typing import Callable, List, Optional, Tuple, Union
+
+import pandas as pd
+
+from paths.store import PathStore
+from src.core.analytics import AnalyticsEngine
+from src.core.context.engine import ContextualEngine
+from src.core.context.profiling import EngineProfile
+from src.core.execution import ExecutionEngine
+from src.core.feed.monte_carlo import MonteCarloDataFeed
+from src.core.feed.shared import SharedPathMatrix
+from src.core.strategy.stateful import StatefulStrategy
+
+
+def run_chunk(job) -> Tuple[List[ExecutionEngine], Optional[EngineProfile]]:
+    """
+    Backtests a chunk of consecutive paths (in a pool worker).
+
+    :param job: tuple (shared matrix or store, first column, last column + 1, strategy factory, epoch_ns, profile)
+    :return: the agents, in column order, and the profile of the chunk (if profiled)
+    """
+    shared, start, stop, strategy_factory, epoch_ns, profile = job
+    analytics = AnalyticsEngine()
+
+    for column in range(start, stop):
+        feed = MonteCarloDataFeed(shared, columns=[column, ], epoch_ns=epoch_ns)
+        bt = ContextualEngine(data=feed,
+                              agent=ExecutionEngine(strategy_factory()),
+                              analytics=analytics,
+                              profile=profile)
+        bt.start()
+
+    # Track records are pickled compactly on the way back
+    return analytics.realizations, profile
+
+
+class BacktestRunner(object):
+    """
+    Runs the same strategy on every path of a Monte Carlo set, over a process pool.
+
+    The paths are published once in shared memory and scheduled by chunks of
+    consecutive columns. Agents come back to the parent analytics engine in
+    path order, whatever the number of workers.
+
+    For example:
+
+    factory = partial(CppiStrategy, floor=0.8, reset_freq=dt.timedelta(days=100))
+    runner = BacktestRunner(df_paths, factory, workers=8, chunk_size=16)
+    analytics = runner.run()
+
+    """
+
+    def __init__(self, paths: Union[pd.DataFrame, SharedPathMatrix, PathStore],
+                 strategy_factory: Callable[[], StatefulStrategy],
+                 analytics: AnalyticsEngine = None, workers: int = None,
+                 chunk_size: int = None, epoch_ns: bool = False, profile: EngineProfile = None):
+        #
+        # Path source: a DataFrame is published in shared memory when running,
+        # a PathStore is reopened (memory-mapped) by each worker
+        self.paths = paths
+
+        # Must be picklable (e.g. a class or a functools.partial)
+        self.strategy_factory = strategy_factory
+
+        # Results are stored in this engine
+        self.analytics: AnalyticsEngine = analytics if analytics is not None else AnalyticsEngine()
+
+        # Scheduling
+        self.workers: int = max(1, int(workers)) if workers is not None else cpu_count()
+        self.chunk_size = chunk_size
+        self.epoch_ns: bool = epoch_ns
+
+        # Optional instrumentation, merged from the chunks
+        self.profile: Optional[EngineProfile] = profile
+
+    @property
+    def nb_paths(self):
+        return self.paths.shape[1]
+
+    def chunks(self) -> List[range]:
+        """
+        Consecutive column ranges, by default about 4 chunks per worker.
+        """
+        nb_paths = self.nb_paths
+        size = self.chunk_size if self.chunk_size is not None else math.ceil(nb_paths / (4 * self.workers))
+        size = max(1, int(size))
+        return [range(i, min(i + size, nb_paths)) for i in range(0, nb_paths, size)]
+
+    def run(self) -> AnalyticsEngine:
+
+        # Feeds are built on the clock of the runner: the strategies must use the same
+        strategy = self.strategy_factory()
+        if strategy.epoch_ns != self.epoch_ns:
+            raise ValueError(f"The strategy factory builds strategies with epoch_ns={strategy.epoch_ns}, "
+                             f"the runner has epoch_ns={self.epoch_ns}: both must use the same clock.")
+
+        if isinstance(self.paths, (SharedPathMatrix, PathStore)):
+            self.__run(self.paths)
+
+        else:
+            with SharedPathMatrix.from_frame(self.paths) as shared:
+                self.__run(shared)
+
+        return self.analytics
+
+    def __run(self, shared: Union[SharedPathMatrix, PathStore]):
+        profile = self.profile
+        jobs = [(shared, c.start, c.stop, self.strategy_factory, self.epoch_ns,
+                 profile.empty(first_path=c.start) if profile is not None else None) for c in self.chunks()]
+
+        if self.workers == 1:
+            results = map(run_chunk, jobs)
+            self.__gather(results)
+            return
+
+        with Pool(processes=self.workers) as pool:
+            # imap keeps the order of the jobs, results streamed as chunks complete
+            self.__gather(pool.imap(run_chunk, jobs))
+
+    def __gather(self, results):
+        for agents, profile in results:
+            for agent in agents:
+                self.analytics.store(agent)
+            if profile is not None:
+                self.profile.merge(profile)
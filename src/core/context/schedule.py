@@ -1,17 +1,30 @@
 import datetime as dt
-from typing import Optional
+from typing import Optional, Union
 
 from src.core.context.exceptions import CausalityException
 
+SECONDS_PER_YEAR = 365.25 * 24 * 60 * 60
+
+# Integer clock (epoch nanoseconds)
+NS_PER_SECOND = 1_000_000_000
+NS_PER_YEAR = int(SECONDS_PER_YEAR * NS_PER_SECOND)
+
 
 class TimeKeeper(object):
 
-    def __init__(self, start_dt: dt.datetime = None):
+    def __init__(self, start_dt: dt.datetime = None, epoch_ns: bool = False):
         """
         Class managing the evolution of time during a simulation.
+
+        With epoch_ns, dates are int64 epoch nanoseconds instead of datetime
+        objects (no object created per tick). In both modes, timestamps are
+        truncated to the second, so that both clocks see the same dates.
         """
+        # Clock mode
+        self.epoch_ns: bool = epoch_ns
+
         # Current date (our current filtration)
-        self.current_dt: Optional[dt.datetime] = start_dt
+        self.current_dt: Optional[Union[dt.datetime, int]] = start_dt
 
         # Observations (time steps)
         self.obs_counter: int = -1
@@ -20,6 +33,8 @@ class TimeKeeper(object):
     def timestamp(self):
         if self.current_dt is None:
             raise NotImplementedError("TimeKeeper has not been initialized.")
+        if self.epoch_ns:
+            return self.current_dt // NS_PER_SECOND * NS_PER_SECOND
         return dt.datetime(year=self.current_dt.year,  # boxed
                            month=self.current_dt.month,
                            day=self.current_dt.day,
@@ -27,6 +42,13 @@ class TimeKeeper(object):
                            minute=self.current_dt.minute,
                            second=self.current_dt.second)
 
+    @staticmethod
+    def to_datetime(timestamp_ns: int) -> dt.datetime:
+        """
+        Converts an epoch nanoseconds timestamp (reporting only).
+        """
+        return dt.datetime(1970, 1, 1) + dt.timedelta(microseconds=timestamp_ns // 1000)
+
     def reset(self, date: dt.datetime):
         self.current_dt = date
         self.obs_counter = -1
@@ -44,3 +66,12 @@ class TimeKeeper(object):
 
         else:
             self.current_dt = date
+
+    def fast_forward(self, date, steps: int):
+        """
+        Moves to a later date, skipping steps observations at once.
+        """
+        if self.current_dt is not None and date <= self.current_dt:
+            raise CausalityException("Going backward in time.")
+        self.obs_counter += steps
+        self.current_dt = date
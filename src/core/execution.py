@@ -14,6 +14,12 @@ class ExecutionEngine(DataFeedObserver):
     def upon_notification(self, feed, *args, **kwargs):
         self.strategy.upon_notification(feed, *args, **kwargs)
 
+    def tick_handler(self, feed):
+        # Ticks go straight to the strategy, unless a subclass handles the notifications
+        if type(self).upon_notification is not ExecutionEngine.upon_notification:
+            return super().tick_handler(feed)
+        return self.strategy.tick_handler(feed)
+
     def initialize(self, data: DataFeed):
         data.subscribe(self)
 
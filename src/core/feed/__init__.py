@@ -1,2 +1,4 @@
-from src.core.feed.data import DataFeed, DataFeedObserver
-from src.core.feed.monte_carlo import MonteCarloDataFeed
\ No newline at end of file
+from src.core.feed.data import DataFeed, DataFeedObserver, Tick
+from src.core.feed.monte_carlo import MonteCarloDataFeed
+from src.core.feed.shared import SharedPathMatrix
+from src.core.feed.candle import GbmCandleDataFeed
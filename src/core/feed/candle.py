@@ -0,0 +1,180 @@
+import datetime as dt
+import math
+from typing import Optional
+
+import numpy as np
+
+from paths.gbm import GeometricBrownianMotion
+from src.core.feed.data import DataFeed
+from src.core.context.schedule import TimeKeeper, NS_PER_SECOND
+
+
+class GbmCandleDataFeed(DataFeed):
+    """
+    Streams OHLC bars of a GBM path simulated on a finer sub-grid.
+
+    The bars are those of the process time grid (one per time interval), each
+    split into sub_steps simulated on the fly and aggregated incrementally: the
+    fine grid is never materialized, memory is bounded by chunk_size whatever
+    the number of sub-steps. Observers are notified once per bar, at its close.
+
+    A bar covers [t(k), t(k+1)]: it opens at the previous close, and its
+    high/low include every sub-step. Bid and ask are the closing price.
+
+    Each start simulates a new path from the random streams of the process.
+    With antithetic sampling, runs come in pairs: every second run replays
+    the shocks of the previous one, negated. Sobol sampling and bridge
+    ordering need the whole path at once and are not supported.
+
+    For example, 1-minute sub-steps over 5 years of daily bars:
+
+    gbm = GeometricBrownianMotion(volatility=0.25, maturity=5.0, time_intervals=1825)
+    feed = GbmCandleDataFeed(gbm, sub_steps=24 * 60)
+
+    """
+
+    def __init__(self, process: GeometricBrownianMotion, sub_steps: int = 1440, start: dt.datetime = None,
+                 basis=365, epoch_ns: bool = False, chunk_size: int = 4096):
+
+        super().__init__()
+
+        # Process (volatility, drift, initial value, bars grid and random streams)
+        if process.rng.sampling == "sobol" or process.rng.bridge_ordering:
+            raise ValueError("Sub-steps are streamed: Sobol sampling and bridge ordering are not supported.")
+        self.process = process
+        self.sub_steps: int = max(1, int(sub_steps))
+        self.chunk_size: int = max(1, int(chunk_size))
+
+        # Time origin and bar duration
+        self.start_dt: dt.datetime = start if start is not None else dt.datetime.today()
+        self.bar_duration = dt.timedelta(days=process.time.dt * basis)
+
+        # Fields to be queried by observers
+        self.epoch_ns: bool = epoch_ns
+        self.time = TimeKeeper(epoch_ns=epoch_ns)
+        self.price_open: Optional[float] = None
+        self.price_high: Optional[float] = None
+        self.price_low: Optional[float] = None
+        self.price_close: Optional[float] = None
+
+        self.running: bool = False
+
+        # Draw of the previous run, to be replayed negated (antithetic sampling)
+        self.__antithetic_draw: Optional[int] = None
+
+    def initialize(self) -> bool:
+        return True  # nothing to load, bars are simulated in start
+
+    @property
+    def tick_count(self):
+        return self.time.obs_counter + 1
+
+    def get_timestamp(self):
+        return self.time.timestamp
+
+    def get_price_open(self):
+        return self.price_open
+
+    def get_price_high(self):
+        return self.price_high
+
+    def get_price_low(self):
+        return self.price_low
+
+    def get_price_close(self):
+        return self.price_close
+
+    def get_price_bid(self):
+        return self.price_close
+
+    def get_price_ask(self):
+        return self.price_close
+
+    def get_volume_bid(self):
+        return 1e9  # ignoring volume for now
+
+    def get_volume_ask(self):
+        return 1e9
+
+    def stop(self) -> None:
+        self.running = False
+
+    def __stream(self):
+        # Generator of the next run and sign of its shocks
+        rng = self.process.rng
+        if self.__antithetic_draw is not None:
+            draw, self.__antithetic_draw = self.__antithetic_draw, None
+            return rng.generator(block=0, draw=draw), -1.0
+
+        draw = rng.next_draw()
+        if rng.sampling == "antithetic":
+            self.__antithetic_draw = draw
+        return rng.generator(block=0, draw=draw), 1.0
+
+    def start(self) -> None:
+
+        process = self.process
+        nb_bars = process.time.intervals
+
+        # Sub-step log-increments
+        sub_dt = process.time.dt / self.sub_steps
+        drift = (process.drift - 0.5 * process.volatility ** 2) * sub_dt
+        vol = process.volatility * math.sqrt(sub_dt)
+
+        # New draw of the process (or the previous one, antithetic), single path stream
+        rng, sign = self.__stream()
+        vol *= sign
+        buffer = np.empty(min(self.sub_steps, self.chunk_size))
+
+        # Bar closing times
+        if self.epoch_ns:
+            origin = int(np.datetime64(self.start_dt, "ns").astype(np.int64))
+            step = int(self.bar_duration.total_seconds() * NS_PER_SECOND)
+        else:
+            origin, step = self.start_dt, self.bar_duration
+        self.time.reset(date=origin)
+
+        log_close = math.log(process.initial_value)
+        self.running = True
+
+        tick = self.tick
+        tick.volume_bid = tick.volume_ask = self.get_volume_bid()
+        handlers = self.freeze()
+
+        for k in range(nb_bars):
+            log_open = log_high = log_low = log_close
+
+            # Sub-steps of the bar, by chunks
+            remaining = self.sub_steps
+            while remaining:
+                z = buffer[:min(remaining, len(buffer))]
+                rng.standard_normal(out=z)
+                z *= vol
+                z += drift
+                np.cumsum(z, out=z)
+                z += log_close
+
+                log_high = max(log_high, z.max())
+                log_low = min(log_low, z.min())
+                log_close = z[-1].item()
+                remaining -= len(z)
+
+            # Update current time (bar close)
+            self.time.update(origin + (k + 1) * step)
+
+            # Update the bar
+            self.price_open = math.exp(log_open)
+            self.price_high = math.exp(log_high)
+            self.price_low = math.exp(log_low)
+            self.price_close = math.exp(log_close)
+            tick.timestamp = self.time.timestamp
+            tick.bid = tick.ask = self.price_close
+
+            # Notify observers
+            for handler in handlers:
+                handler(tick)
+
+            if not self.running:
+                break
+
+        self.running = False
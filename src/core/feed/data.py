@@ -1,21 +1,60 @@
 from abc import ABC, abstractmethod
-from typing import List
+from functools import partial
+from typing import Callable, List, Tuple
 
 from src.patterns.observer import Observable
 
 
+class Tick(object):
+    """
+    Current data point, pushed to the observers (see DataFeed.freeze).
+
+    A single instance is updated in place by the feed on every tick: observers
+    must copy the values they want to keep.
+
+    Feeds knowing their time grid in advance may also provide the year
+    fraction elapsed since the previous tick (None otherwise).
+    """
+
+    __slots__ = ("timestamp", "year_fraction", "bid", "ask", "volume_bid", "volume_ask")
+
+    def __init__(self):
+        self.timestamp = None
+        self.year_fraction = None
+        self.bid: float = float("nan")
+        self.ask: float = float("nan")
+        self.volume_bid: float = 0.0
+        self.volume_ask: float = 0.0
+
+
 class DataFeedObserver(ABC):
 
     @abstractmethod
     def upon_notification(self, feed, *args, **kwargs):
         raise NotImplementedError("Data feed observer notification handler not implemented")
 
+    def tick_handler(self, feed) -> Callable[[Tick], None]:
+        """
+        Callable receiving the Tick pushed by the feed.
+
+        By default, the observer pulls the data from the feed as in
+        upon_notification. Observers override this to receive the tick.
+        """
+        return partial(self.upon_notification, feed)
+
 
 class DataFeed(object):
 
+    # Whether the feed handles the EarlyTerminationException of its observers
+    # (fast-forward over the data they skip, see MonteCarloDataFeed)
+    supports_fast_forward: bool = False
+
     def __init__(self):
         self.observers: List[DataFeedObserver] = []
 
+        # Reusable record of the current data point (push dispatch)
+        self.tick = Tick()
+
     def notify(self) -> None:
         """
         Notify all the observers for the arrival of a new data point.
@@ -23,6 +62,22 @@ class DataFeed(object):
         for observer in self.observers:
             observer.upon_notification(self)
 
+    def freeze(self) -> Tuple[Callable[[Tick], None], ...]:
+        """
+        Tick handlers of the current observers, resolved once before the flow
+        of notifications (observers subscribed later are not called until the
+        next start).
+        """
+        return tuple(observer.tick_handler(self) for observer in self.observers)
+
+    @property
+    def tick_count(self):
+        """
+        Number of data points consumed since start, fast-forwarded ones
+        included (None if the feed does not keep count).
+        """
+        return None
+
     def subscribe(self, subscriber: DataFeedObserver) -> None:
         """
         To attach a subscriber.
@@ -76,6 +131,30 @@ class DataFeed(object):
         """
         raise NotImplementedError("Specific to derived classes.")
 
+    def get_price_open(self):
+        """
+        Provides the opening price of the current bar (candle feeds).
+        """
+        raise NotImplementedError("Specific to derived classes.")
+
+    def get_price_high(self):
+        """
+        Provides the highest price of the current bar (candle feeds).
+        """
+        raise NotImplementedError("Specific to derived classes.")
+
+    def get_price_low(self):
+        """
+        Provides the lowest price of the current bar (candle feeds).
+        """
+        raise NotImplementedError("Specific to derived classes.")
+
+    def get_price_close(self):
+        """
+        Provides the closing price of the current bar (candle feeds).
+        """
+        raise NotImplementedError("Specific to derived classes.")
+
     def get_volume_bid(self):
         """
         Provides the current bid volume.
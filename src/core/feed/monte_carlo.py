@@ -1,40 +1,112 @@
+import numpy as np
 import pandas as pd
 import datetime as dt
-from typing import Optional
+from bisect import bisect_left
+from itertools import islice
+from typing import Optional, Union
 from src.core.feed.data import DataFeed
-from src.core.context.schedule import TimeKeeper
+from src.core.context.exceptions import EarlyTerminationException
+from paths.store import PathStore
+from src.core.feed.shared import SharedPathMatrix
+from src.core.context.schedule import TimeKeeper, NS_PER_SECOND, NS_PER_YEAR, SECONDS_PER_YEAR
 
 
 class MonteCarloDataFeed(DataFeed):
 
-    def __init__(self, csv_path_or_df, columns=None):
+    supports_fast_forward = True
+
+    def __init__(self, csv_path_or_df, columns=None, int64_timestamps: bool = False, epoch_ns: bool = False):
 
         super().__init__()
 
         self.dataset: Optional[pd.DataFrame] = None
+        self.shared: Optional[Union[SharedPathMatrix, PathStore]] = None
+
+        self.columns = columns if columns is not None else [0, ]
+        assert isinstance(self.columns, list)
 
         if isinstance(csv_path_or_df, pd.DataFrame):
             self.dataset = csv_path_or_df
 
-        if not isinstance(csv_path_or_df, pd.DataFrame):
+        elif isinstance(csv_path_or_df, (SharedPathMatrix, PathStore)):
+            self.shared = csv_path_or_df  # only the requested columns will be read
+
+        elif PathStore.exists(csv_path_or_df):
+            self.file_path = csv_path_or_df
+            self.shared = PathStore(csv_path_or_df)  # binary store (see PathStore.from_csv)
+
+        elif str(csv_path_or_df).endswith(".parquet"):
+            self.file_path = csv_path_or_df
+            self.__initialize_parquet()
+
+        else:
             self.file_path = csv_path_or_df
             self.__initialize()
 
-        self.columns = columns if columns is not None else [0, ]
-        assert isinstance(self.columns, list)
+        # Clock in epoch nanoseconds (requires the int64 timestamps)
+        self.epoch_ns: bool = epoch_ns
+
+        # Contiguous buffers, extracted once from the dataset
+        self.int64_timestamps: bool = int64_timestamps or epoch_ns
+        self.prices: Optional[np.ndarray] = None  # (steps, columns)
+        self.index: Optional[np.ndarray] = None  # datetime objects (not built in epoch_ns mode)
+        self.timestamps_ns: Optional[np.ndarray] = None  # int64 epoch nanoseconds (optional)
+        self.year_fractions: Optional[np.ndarray] = None  # time elapsed since the previous tick
 
         # Fields to be queried by observers
-        self.time = TimeKeeper()
+        self.time = TimeKeeper(epoch_ns=epoch_ns)
+
+        # Timestamps as seen by observers (int64 epoch ns or datetime64 to the second), if they fast-forward
+        self.__index_ns: Optional[np.ndarray] = None
+        self.observed_index: Optional[np.ndarray] = None
         self.price: Optional[float] = None
 
     def initialize(self) -> bool:
+        if self.shared is not None:
+            return self.__initialize_shared()
+
         assert isinstance(self.dataset, pd.DataFrame)
+
+        # Price column(s) and index as NumPy arrays (no pandas indexing per tick)
+        self.prices = np.ascontiguousarray(self.dataset[self.columns].to_numpy(dtype=np.float64))
+        self.__set_index(np.asarray(self.dataset.index, dtype="datetime64[ns]").astype(np.int64))
+        return True
+
+    def __initialize_shared(self) -> bool:
+        # Only the requested columns are copied out of the shared segment (or read from disk)
+        if isinstance(self.shared, PathStore):
+            matrix, positions = self.shared.paths, self.shared.positions(self.columns)
+        else:
+            matrix, positions = self.shared.array, self.columns
+        self.prices = np.ascontiguousarray(matrix[:, positions], dtype=np.float64)
+        self.__set_index(self.shared.index_ns.copy())
         return True
 
+    def __set_index(self, index_ns: np.ndarray):
+        # Datetime objects only for the datetime clock
+        self.__index_ns = index_ns
+        self.index = None if self.epoch_ns else pd.to_datetime(index_ns).to_pydatetime()
+
+        if self.int64_timestamps:
+            self.timestamps_ns = index_ns
+
+        # Year fractions between the timestamps seen by observers, truncated to the
+        # second by the timekeeper (same operations as StatefulStrategy.year_fraction)
+        self.year_fractions = np.zeros(len(index_ns))
+        if self.epoch_ns:
+            self.year_fractions[1:] = np.diff(index_ns // NS_PER_SECOND * NS_PER_SECOND) / NS_PER_YEAR
+        else:
+            self.year_fractions[1:] = np.diff(index_ns // NS_PER_SECOND) / SECONDS_PER_YEAR
+
     def __initialize(self):
         # Load the dataframe from disk
-        df = pd.read_csv(self.file_path)
+        self.__set_dataset(pd.read_csv(self.file_path))
+
+    def __initialize_parquet(self):
+        # Columnar file: only the date and requested columns are read
+        self.__set_dataset(pd.read_parquet(self.file_path, columns=["Date"] + [str(c) for c in self.columns]))
 
+    def __set_dataset(self, df: pd.DataFrame):
         # Set a correct time index
         df["Index"] = pd.to_datetime(df["Date"])
 
@@ -52,6 +124,18 @@ class MonteCarloDataFeed(DataFeed):
 
     def sanity_check(self):
 
+        if self.shared is not None:
+            # Required columns are there (KeyError from the store if a label is missing)
+            positions = self.shared.positions(self.columns) if isinstance(self.shared, PathStore) else self.columns
+            for p in positions:
+                assert 0 <= p < self.shared.nb_paths
+
+            # Indexed correctly: one increasing timestamp per step
+            index_ns = self.shared.index_ns
+            assert len(index_ns) == self.shared.shape[0]
+            assert (np.diff(index_ns) > 0).all()
+            return
+
         # Required columns are there
         df_cols = self.dataset.columns
         for c in self.columns:
@@ -61,6 +145,10 @@ class MonteCarloDataFeed(DataFeed):
         assert isinstance(self.dataset.index.min(), dt.datetime)
         assert isinstance(self.dataset.index.max(), dt.datetime)
 
+    @property
+    def tick_count(self):
+        return self.time.obs_counter + 1
+
     def get_timestamp(self):
         return self.time.timestamp
 
@@ -78,22 +166,63 @@ class MonteCarloDataFeed(DataFeed):
 
     def start(self) -> None:
 
-        if not len(self.dataset):
+        if self.prices is None:
             self.initialize()
 
-        # The column(s) we're using
-        col = self.columns
+        # Timestamps fed to the timekeeper
+        index = self.timestamps_ns.tolist() if self.epoch_ns else self.index
+        self.observed_index = None
 
         # Start our timekeeper
-        epsilon = dt.timedelta(seconds=1.0)
-        self.time.reset(date=self.dataset.index.min() - epsilon)
-
-        for k in range(len(self.dataset)):
+        epsilon = NS_PER_SECOND if self.epoch_ns else dt.timedelta(seconds=1.0)
+        self.time.reset(date=index[0] - epsilon)
+
+        # References for speed...
+        time = self.time
+        tick = self.tick
+        tick.volume_bid = tick.volume_ask = self.get_volume_bid()
+        handlers = self.freeze()
+
+        # Iterate over the buffers (assumes only closing px, first column)
+        ticks = zip(index, self.year_fractions.tolist(), self.prices[:, 0].tolist())
+        for timestamp, year_fraction, price in ticks:
             # Update current time
-            self.time.update(self.dataset.index[k])
+            time.update(timestamp)
 
             # Update the current price (only mid)
-            self.price = self.dataset[col].iloc[k].to_numpy()[0]  # assumes only closing px
+            self.price = price
+            tick.timestamp = time.timestamp
+            tick.year_fraction = year_fraction
+            tick.bid = tick.ask = price
 
             # Notify observers
-            self.notify()
+            try:
+                for handler in handlers:
+                    handler(tick)
+
+            except EarlyTerminationException as exc:
+                skipped = self.__fast_forward(exc, index)
+                if skipped:
+                    next(islice(ticks, skipped - 1, skipped), None)  # consumed by the observer
+
+    def __fast_forward(self, exc: EarlyTerminationException, index) -> int:
+        # Hands over the data up to the requested date, returns the number of ticks consumed
+        if exc.fast_forward is None:
+            raise exc
+
+        if self.observed_index is None:
+            ns = self.__index_ns
+            # As returned by the timekeeper: truncated to the second
+            ns = ns // NS_PER_SECOND * NS_PER_SECOND
+            self.observed_index = ns if self.epoch_ns else ns.astype("datetime64[ns]")
+
+        k = self.time.obs_counter
+        stop = bisect_left(index, exc.until, lo=k + 1)
+        if stop <= k + 1:
+            return 0
+
+        skipped = exc.fast_forward(self.observed_index[k + 1:stop], self.prices[k + 1:stop, 0])
+        if skipped:
+            self.time.fast_forward(index[k + skipped], skipped)
+            self.price = self.prices[k + skipped, 0].item()
+        return skipped
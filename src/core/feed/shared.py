@@ -0,0 +1,77 @@
+from multiprocessing.shared_memory import SharedMemory
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+
+class SharedPathMatrix(object):
+    """
+    Monte Carlo paths published once in shared memory.
+
+    The segment holds the time index (int64 epoch nanoseconds) followed by the
+    (steps, paths) float64 matrix. Pickling an instance only sends the name
+    and shape of the segment: workers attach to it and read the paths in place.
+    Only the publisher unlinks the segment (pool workers share its resource
+    tracker, so attaching does not hand the segment over to them).
+
+    For example:
+
+    with SharedPathMatrix.from_frame(df_paths) as shared:
+        analytics = BacktestRunner(shared, factory).run()
+
+    (BacktestRunner publishes a DataFrame of paths itself.)
+
+    """
+
+    def __init__(self, name: Optional[str], shape: tuple, create: bool = False):
+        self.shape = tuple(shape)
+        self.owner: bool = create
+
+        nb_steps, nb_paths = self.shape
+        size = 8 * nb_steps * (nb_paths + 1)
+        self.shm: Optional[SharedMemory] = SharedMemory(name=name, create=create, size=size if create else 0)
+        self.name: str = self.shm.name
+
+        # Views on the segment
+        self.index_ns = np.ndarray((nb_steps, ), dtype=np.int64, buffer=self.shm.buf)
+        self.array = np.ndarray(self.shape, dtype=np.float64, buffer=self.shm.buf, offset=8 * nb_steps)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, name: str = None):
+        """
+        Publishes the paths of a DataFrame (datetime index, one column per path).
+        """
+        shared = cls(name=name, shape=df.shape, create=True)
+        shared.index_ns[:] = np.asarray(df.index, dtype="datetime64[ns]").astype(np.int64)
+        shared.array[:] = df.to_numpy(dtype=np.float64)
+        return shared
+
+    @property
+    def nb_steps(self):
+        return self.shape[0]
+
+    @property
+    def nb_paths(self):
+        return self.shape[1]
+
+    def close(self):
+        if self.shm is None:
+            return
+        self.index_ns = self.array = None  # release the views first
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+        self.shm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __getstate__(self):
+        return {"name": self.name, "shape": self.shape}
+
+    def __setstate__(self, state):
+        self.__init__(name=state["name"], shape=state["shape"], create=False)
@@ -0,0 +1,168 @@
+from typing import Sequence
+
+import numpy as np
+import pandas as pd
+
+# Track record fields of a CPPI strategy, in panel order
+PANEL_FIELDS = ("price", "ptf_value", "protection", "exposure", "shares", "bond")
+
+# Fields the risk metrics are computed from, in argument order
+RISK_FIELDS = ("price", "ptf_value", "protection", "exposure", "shares")
+
+
+def cppi_path_metrics(price: np.ndarray, ptf_value: np.ndarray, protection: np.ndarray,
+                      exposure: np.ndarray, shares: np.ndarray) -> pd.DataFrame:
+    """
+    Risk figures of every path, from the (ticks, paths) track record fields:
+
+    * max_gap: largest shortfall under the protection level (gap risk)
+    * breached: ever under the protection level
+    * terminal_value: final portfolio value, by the initial value
+    * terminal_breach: under the protection level at maturity
+    * cash_locked: share of ticks with no exposure to the underlying
+    * turnover: traded amount of the underlying, by the portfolio value,
+      summed over the ticks
+    """
+    initial = ptf_value[0]
+
+    # Temporaries updated in place (a single (ticks, paths) array at a time)
+    gap = np.subtract(protection, ptf_value)
+    np.maximum(gap, 0.0, out=gap)
+    max_gap = gap.max(axis=0) / initial
+    del gap
+
+    traded = np.diff(shares, axis=0)
+    np.abs(traded, out=traded)
+    traded *= price[1:]
+    traded /= ptf_value[1:]
+
+    return pd.DataFrame({"max_gap": max_gap,
+                         "breached": max_gap > 0.0,
+                         "terminal_value": ptf_value[-1] / initial,
+                         "terminal_breach": ptf_value[-1] < protection[-1],
+                         "cash_locked": (exposure <= 0.0).mean(axis=0),
+                         "turnover": traded.sum(axis=0)})
+
+
+def cppi_risk_metrics(price: np.ndarray, ptf_value: np.ndarray, protection: np.ndarray,
+                      exposure: np.ndarray, shares: np.ndarray,
+                      quantiles=(0.01, 0.05, 0.5, 0.95, 0.99)) -> pd.Series:
+    """
+    Risk figures across paths, from the (ticks, paths) track record fields:
+    gap risk, probability of breaching the protection level (at any time and
+    at maturity), distribution of the terminal value, time spent cash-locked
+    and turnover.
+    """
+    paths = cppi_path_metrics(price, ptf_value, protection, exposure, shares)
+    return cppi_summary_metrics(paths, quantiles=quantiles)
+
+
+def cppi_summary_metrics(paths: pd.DataFrame, quantiles=(0.01, 0.05, 0.5, 0.95, 0.99)) -> pd.Series:
+    """
+    Risk figures across paths (see cppi_risk_metrics), from the per-path
+    figures of cppi_path_metrics, e.g. concatenated over chunks of paths.
+    """
+    terminal = paths["terminal_value"].to_numpy()
+    nb_paths = len(paths)
+
+    metrics = {"nb_paths": nb_paths,
+               "gap_risk_mean": paths["max_gap"].mean(),
+               "gap_risk_max": paths["max_gap"].max(),
+               "breach_probability": paths["breached"].mean(),
+               "terminal_breach_probability": paths["terminal_breach"].mean(),
+               "terminal_mean": terminal.mean(),
+               "terminal_std": terminal.std(ddof=1) if nb_paths > 1 else np.nan}
+    for q, v in zip(quantiles, np.quantile(terminal, quantiles)):
+        metrics[f"terminal_q{q:g}"] = v
+    metrics.update({"cash_locked_mean": paths["cash_locked"].mean(),
+                    "cash_locked_probability": (paths["cash_locked"] > 0.0).mean(),
+                    "turnover_mean": paths["turnover"].mean()})
+    return pd.Series(metrics)
+
+
+class SummaryPanel(object):
+    """
+    Track records of all the paths in a single (fields, ticks, paths) array.
+
+    Cross-path figures are then reductions over the ticks and paths of a
+    field, instead of one DataFrame per agent: each field is a contiguous
+    (ticks, paths) block. All paths must share the same dates.
+
+    For example, after a backtest:
+
+    panel = analytics.panel()
+    panel.risk_metrics()
+
+    """
+
+    def __init__(self, index: pd.DatetimeIndex, values: np.ndarray, fields: Sequence[str] = PANEL_FIELDS):
+        self.index = index
+        self.values = values
+        self.fields = tuple(fields)
+        assert values.shape[0] == len(self.fields), "values must be shaped (fields, ticks, paths)"
+
+    @classmethod
+    def from_agents(cls, agents: list, fields: Sequence[str] = PANEL_FIELDS):
+        """
+        Panel of the track records of the agents (one path per agent).
+        """
+        if not agents:
+            raise ValueError("No agent to build the panel from.")
+
+        strategy = agents[0].strategy
+        idx = strategy.record.timestamps.copy()
+        index = pd.to_datetime(idx, unit="ns") if strategy.epoch_ns else pd.DatetimeIndex(idx)
+
+        values = np.empty((len(fields), len(index), len(agents)))
+        for j, agent in enumerate(agents):
+            record = agent.strategy.record
+            assert len(record) == len(index), "all paths must share the same dates"
+            for f, field in enumerate(fields):
+                values[f, :, j] = record.column(field)
+        return cls(index, values, fields)
+
+    @classmethod
+    def from_batch(cls, result, fields: Sequence[str] = PANEL_FIELDS):
+        """
+        Panel of a vectorized run (CppiBatchResult, fields as attributes).
+        """
+        values = np.stack([getattr(result, field) for field in fields], axis=0)
+        return cls(pd.DatetimeIndex(result.index), values, fields)
+
+    @property
+    def nb_ticks(self):
+        return self.values.shape[1]
+
+    @property
+    def nb_paths(self):
+        return self.values.shape[2]
+
+    def field(self, name: str) -> np.ndarray:
+        """
+        (ticks, paths) view of a field (contiguous).
+        """
+        return self.values[self.fields.index(name)]
+
+    def normalized(self) -> np.ndarray:
+        """
+        (3, ticks, paths) array of the CPPI, protection and underlying, by
+        initial values (AnalyticsEngine.summarize, for every path at once).
+        """
+        ptf, px = self.field("ptf_value"), self.field("price")
+        out = np.empty((3, self.nb_ticks, self.nb_paths))
+        np.divide(ptf, ptf[0], out=out[0])
+        np.divide(self.field("protection"), ptf[0], out=out[1])
+        np.divide(px, px[0], out=out[2])
+        return out
+
+    def per_path(self) -> pd.DataFrame:
+        """
+        Risk figures of every path (see cppi_path_metrics).
+        """
+        return cppi_path_metrics(*(self.field(f) for f in RISK_FIELDS))
+
+    def risk_metrics(self, quantiles=(0.01, 0.05, 0.5, 0.95, 0.99)) -> pd.Series:
+        """
+        Risk figures across paths (see cppi_risk_metrics).
+        """
+        return cppi_risk_metrics(*(self.field(f) for f in RISK_FIELDS), quantiles=quantiles)
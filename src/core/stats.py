@@ -0,0 +1,110 @@
+import numpy as np
+
+
+class RunningMoments(object):
+    """
+    Mean and variance of a stream of vectors, element-wise (Welford).
+
+    Each update is one observation of every element, e.g. one path observed
+    at every tick: memory is that of a few vectors, whatever the number of
+    observations.
+    """
+
+    __slots__ = ("count", "mean", "m2")
+
+    def __init__(self, size: int):
+        self.count: int = 0
+        self.mean = np.zeros(size)
+        self.m2 = np.zeros(size)
+
+    def update(self, x: np.ndarray):
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (x - self.mean)
+
+    @property
+    def variance(self) -> np.ndarray:
+        if self.count < 2:
+            return np.full_like(self.mean, np.nan)
+        return self.m2 / (self.count - 1)
+
+    @property
+    def std(self) -> np.ndarray:
+        return np.sqrt(self.variance)
+
+
+class P2Quantile(object):
+    """
+    Streaming estimate of a quantile of vectors, element-wise (P-square).
+
+    The P-square algorithm (Jain & Chlamtac, 1985) tracks five markers per
+    element: the minimum, the maximum, the quantile and two intermediate
+    quantiles, whose heights are adjusted by piecewise-parabolic
+    interpolation as observations come. Memory does not depend on the number
+    of observations; the estimate is exact up to five observations.
+    """
+
+    __slots__ = ("probability", "count", "heights", "positions", "desired", "increments")
+
+    def __init__(self, probability: float, size: int):
+        assert 0.0 < probability < 1.0, "probability must be within (0, 1)"
+        p = float(probability)
+        self.probability = p
+        self.count: int = 0
+
+        # Markers, shaped (5, size)
+        self.heights = np.empty((5, size))
+        self.positions = np.tile(np.arange(1.0, 6.0)[:, None], (1, size))
+        self.desired = np.tile(np.array([1.0, 1.0 + 2.0 * p, 1.0 + 4.0 * p, 3.0 + 2.0 * p, 5.0])[:, None], (1, size))
+        self.increments = np.array([0.0, 0.5 * p, p, 0.5 * (1.0 + p), 1.0])[:, None]
+
+    def update(self, x: np.ndarray):
+        q, n = self.heights, self.positions
+
+        # First observations are kept as they come
+        if self.count < 5:
+            q[self.count] = x
+            self.count += 1
+            if self.count == 5:
+                q.sort(axis=0)
+            return
+        self.count += 1
+
+        # Cell of the new observation, extreme markers extended if needed
+        np.minimum(q[0], x, out=q[0])
+        np.maximum(q[4], x, out=q[4])
+        k = np.clip((x[None, :] >= q[1:4]).sum(axis=0), 0, 3)
+
+        # Markers above the cell move up
+        n += np.arange(5)[:, None] > k[None, :]
+        self.desired += self.increments
+
+        # Adjust the three middle markers if they are off their desired positions
+        for i in (1, 2, 3):
+            d = self.desired[i] - n[i]
+            move = ((d >= 1.0) & (n[i + 1] - n[i] > 1.0)) | ((d <= -1.0) & (n[i - 1] - n[i] < -1.0))
+            if not move.any():
+                continue
+            d = np.where(move, np.sign(d), 0.0)
+
+            # Piecewise-parabolic prediction, linear if not monotonic
+            parabolic = q[i] + d / (n[i + 1] - n[i - 1]) * (
+                (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i]) +
+                (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1]))
+            neighbour = np.where(d > 0.0, i + 1, i - 1)
+            cols = np.arange(q.shape[1])
+            linear = q[i] + d * (q[neighbour, cols] - q[i]) / (n[neighbour, cols] - n[i])
+            ok = (q[i - 1] < parabolic) & (parabolic < q[i + 1])
+
+            q[i] = np.where(move, np.where(ok, parabolic, linear), q[i])
+            n[i] += d
+
+    @property
+    def value(self) -> np.ndarray:
+        if self.count == 0:
+            return np.full(self.heights.shape[1], np.nan)
+        if self.count < 5:
+            # Exact, on the observations so far
+            return np.quantile(self.heights[:self.count], self.probability, axis=0)
+        return self.heights[2].copy()
@@ -1 +1,2 @@
 from src.core.strategy.stateful import StatefulStrategy, StrategyObserver
+from src.core.strategy.record import TrackRecord
@@ -0,0 +1,109 @@
+from typing import Sequence
+
+import numpy as np
+
+
+class TrackRecord(object):
+    """
+    Compact, array-backed history of a strategy.
+
+    One row per tick (the row number being the tick index), one float column
+    per field plus a timestamp column. Columns are preallocated and doubled in
+    size when full, so appending is amortized O(1), as is reading the latest
+    value of a field.
+
+    Columns are returned as views on the underlying buffers: they are only
+    valid until the next append that grows the record.
+    """
+
+    __slots__ = ("fields", "size", "capacity", "_timestamps", "_columns")
+
+    def __init__(self, fields: Sequence[str], capacity: int = 1024, time_dtype="datetime64[us]"):
+        self.fields = tuple(fields)
+        self.size: int = 0
+        self.capacity: int = max(1, int(capacity))
+
+        self._timestamps = np.empty(self.capacity, dtype=time_dtype)
+        self._columns = {f: np.empty(self.capacity, dtype=np.float64) for f in self.fields}
+
+    def __len__(self):
+        return self.size
+
+    def __grow(self):
+        self.capacity = max(1, 2 * self.capacity)
+        self._timestamps = np.resize(self._timestamps, self.capacity)
+        for f, col in self._columns.items():
+            self._columns[f] = np.resize(col, self.capacity)
+
+    def append(self, timestamp, *values) -> int:
+        """
+        Records a new tick, values given in the order of the fields.
+
+        Returns the tick index of the new row.
+        """
+        k = self.size
+        if k == self.capacity:
+            self.__grow()
+
+        self._timestamps[k] = timestamp
+        for f, v in zip(self.fields, values):
+            self._columns[f][k] = v
+
+        self.size = k + 1
+        return k
+
+    def extend(self, timestamps, *values) -> int:
+        """
+        Records several ticks at once, values given in the order of the fields
+        (arrays, one value per tick, or scalars).
+
+        Returns the tick index of the last new row.
+        """
+        k, n = self.size, len(timestamps)
+        while k + n > self.capacity:
+            self.__grow()
+
+        self._timestamps[k:k + n] = timestamps
+        for f, v in zip(self.fields, values):
+            self._columns[f][k:k + n] = v
+
+        self.size = k + n
+        return self.size - 1
+
+    def last(self, field: str) -> float:
+        """
+        Latest value of a field (as a Python float).
+        """
+        if not self.size:
+            raise IndexError("Track record is empty.")
+        return self._columns[field].item(self.size - 1)
+
+    @property
+    def last_timestamp(self):
+        if not self.size:
+            raise IndexError("Track record is empty.")
+        return self._timestamps.item(self.size - 1)
+
+    @property
+    def timestamps(self) -> np.ndarray:
+        return self._timestamps[:self.size]
+
+    def column(self, field: str) -> np.ndarray:
+        return self._columns[field][:self.size]
+
+    def __getstate__(self):
+        # Only the filled rows are pickled (compact results from pool workers)
+        return {"fields": self.fields, "timestamps": self.timestamps.copy(),
+                "columns": {f: self.column(f).copy() for f in self.fields}}
+
+    def __setstate__(self, state):
+        self.fields = state["fields"]
+        self._timestamps = state["timestamps"]
+        self._columns = state["columns"]
+        self.size = self.capacity = len(self._timestamps)
+
+    def to_dict(self, field: str) -> dict:
+        """
+        History of a field as a {timestamp: value} dict.
+        """
+        return dict(zip(self.timestamps.tolist(), self.column(field).tolist()))
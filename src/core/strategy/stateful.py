@@ -2,6 +2,7 @@ from abc import ABC, abstractmethod
 from typing import List
 
 from src.core.feed.data import DataFeedObserver
+from src.core.context.schedule import SECONDS_PER_YEAR, NS_PER_YEAR
 
 
 class StrategyObserver(ABC):
@@ -17,12 +18,24 @@ class StatefulStrategy(DataFeedObserver):
 
     Contains basic logic for strategies running along a given
     Monte Carlo path or along a single realization (live feed).
+
+    With epoch_ns, timestamps received from the data feed are int64 epoch
+    nanoseconds instead of datetime objects (see TimeKeeper).
     """
 
-    def __init__(self, verbose: bool = False):
+    def __init__(self, verbose: bool = False, epoch_ns: bool = False):
         self.verbose: bool = verbose
+        self.epoch_ns: bool = epoch_ns
         self.observers: List[StrategyObserver] = []
 
+    def year_fraction(self, start, end) -> float:
+        """
+        Time elapsed between two timestamps, in years.
+        """
+        if self.epoch_ns:
+            return (end - start) / NS_PER_YEAR
+        return (end - start).total_seconds() / SECONDS_PER_YEAR
+
     def upon_notification(self, data_feed, *args, **kwargs):
         """
         For the subscription to the ** data feed **.
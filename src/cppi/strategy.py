@@ -1,16 +1,73 @@
 import datetime as dt
+from types import MappingProxyType
+from typing import Mapping
+
+import numpy as np
+
+from src.core.context.exceptions import EarlyTerminationException
+from src.core.context.schedule import SECONDS_PER_YEAR, NS_PER_SECOND, NS_PER_YEAR
 from src.core.strategy.stateful import StatefulStrategy
+from src.core.strategy.record import TrackRecord
+
+# Columns of the CPPI track record
+RECORD_FIELDS = ("price", "ptf_value", "protection", "exposure", "shares", "bond")
+
+# Default hurdle rate (annual)
+RISKFREE_RATE = 0.05
+
 
-SECONDS_PER_YEAR = 365.25 * 24 * 60 * 60
+def round_decimals(values, decimals: int) -> np.ndarray:
+    """
+    Element-wise round(x, decimals), with the results of Python's round.
+
+    np.round scales the values by 10 ** decimals before rounding, which turns
+    some values close to half-way the other way than Python (which rounds the
+    exact value, ties to even). Those values are detected and rounded by
+    Python, so that array and per-tick computations agree exactly.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    scale = 10.0 ** decimals
+
+    # Same operations as np.round
+    scaled = values * scale
+    out = np.rint(scaled)
+
+    # Scaled values within a few ulps of half-way (temporaries reused in place)
+    gap = np.subtract(scaled, out)
+    np.abs(gap, out=gap)
+    gap -= 0.5
+    np.abs(gap, out=gap)
+    np.abs(scaled, out=scaled)
+    scaled *= 2.0 ** -51
+    near = gap <= scaled
+
+    out /= scale
+    if near.any():
+        idx = np.flatnonzero(near)
+        out.flat[idx] = [round(v, decimals) for v in values.flat[idx].tolist()]
+    return out
 
 
 class CppiStrategy(StatefulStrategy):
+    """
+    Constant proportion portfolio insurance, protecting a floor of the
+    portfolio value set at every reset date.
+
+    With fast_forward, a path that is cash-locked (no exposure, and the bond
+    cannot grow back above the protection level before the next reset)
+    raises an EarlyTerminationException: the feed then hands over the data
+    up to the next reset, and the bond accrual is recorded in one go (see
+    fill_locked). This only applies if the feed supports it (e.g.
+    MonteCarloDataFeed) and the strategy is its only observer; otherwise the
+    strategy runs tick by tick.
+    """
 
     def __init__(self, floor: float, multiplier: float = None, initial_value: float = None,
-                 reset_freq: dt.timedelta = None, verbose: bool = False):
+                 reset_freq: dt.timedelta = None, verbose: bool = False, epoch_ns: bool = False,
+                 fast_forward: bool = False):
 
         # Init parent class
-        super().__init__(verbose=verbose)
+        super().__init__(verbose=verbose, epoch_ns=epoch_ns)
 
         # Input characteristics
         self.floor = max(0.0, floor)  # percent
@@ -19,8 +76,17 @@ class CppiStrategy(StatefulStrategy):
         # No fixed maturity
         self.reset_freq = reset_freq if reset_freq is not None else dt.timedelta(days=365*1000)
 
+        # Reset frequency in the units of the clock
+        self.reset_period = self.reset_freq
+        if self.epoch_ns:
+            self.reset_period = int(self.reset_freq.total_seconds() * NS_PER_SECOND)
+
         # Hurdle rates
-        self.riskfree_rate = 0.05
+        self.riskfree_rate = RISKFREE_RATE
+
+        # Skip the ticks of cash-locked periods (if the feed allows, see tick_handler)
+        self.fast_forward: bool = fast_forward
+        self.skip_locked: bool = False
 
         # Previous update timestamp
         self.prev_update = None
@@ -29,54 +95,84 @@ class CppiStrategy(StatefulStrategy):
         # Portfolio (ptf) characteristics
         self.ptf_initial_value = max(0.0, initial_value) if initial_value is not None else 1.0
 
-        # The protected levels (intended to reset evey quarter, e.g.)
-        self.ptf_protected_value = {}  # Ptf value at reset dates
+        # Reset dates (sparse)
         self.price_reset = {}  # Price at reset dates
 
+        # History dicts built from the track record, by field: (record length, dict)
+        self.__histories = {}
+
         # Track record (every step)
-        self.ptf_value_history = {}
-        self.risky_exposure = {}
-        self.shares_owned = {}
-        self.asset_price = {}
-        self.riskfree_bond = {}
+        self.record = TrackRecord(fields=RECORD_FIELDS, time_dtype=np.int64 if epoch_ns else "datetime64[us]")
 
     def is_reset(self, timestamp):
-        if len(self.ptf_protected_value) == 0:
+        if not len(self.record):
             return True  # required for initialization
-        return timestamp >= self.reset_freq + self.last_reset
+        return timestamp >= self.reset_period + self.last_reset
 
     @property
     def last_reset(self):
-        return list(sorted(self.price_reset.keys(), reverse=True))[0]
+        return next(reversed(self.price_reset))  # reset dates are increasing
 
     @property
     def bond_value(self):
-        if not len(self.ptf_value_history):
+        if not len(self.record):
             return self.ptf_initial_value
-        last_dt = list(sorted(self.riskfree_bond.keys(), reverse=True))[0]
-        return self.riskfree_bond[last_dt]
+        return self.record.last("bond")
 
     @property
     def exposure_value(self):
-        last_dt = list(sorted(self.risky_exposure.keys(), reverse=True))[0]
-        return self.risky_exposure[last_dt]
+        return self.record.last("exposure")
 
     @property
     def share_count(self):
-        if not len(self.shares_owned):
+        if not len(self.record):
             return 0.0
-        last_dt = list(sorted(self.shares_owned.keys(), reverse=True))[0]
-        return self.shares_owned[last_dt]
+        return self.record.last("shares")
 
     @property
     def ptf_value(self):
-        last_dt = list(sorted(self.ptf_value_history.keys(), reverse=True))[0]
-        return self.ptf_protected_value[last_dt]
+        return self.record.last("ptf_value")
 
     @property
     def ptf_protection(self):
-        last_dt = list(sorted(self.ptf_protected_value.keys(), reverse=True))[0]
-        return self.ptf_protected_value[last_dt]
+        return self.record.last("protection")
+
+    # History as {timestamp: value} mappings, read-only snapshots of the track
+    # record (built once per record length, the record being the source of truth)
+
+    def history(self, field: str) -> Mapping:
+        """
+        History of a field of the track record, as a read-only {timestamp: value} mapping.
+        """
+        cached = self.__histories.get(field)
+        if cached is None or cached[0] != len(self.record):
+            cached = (len(self.record), self.record.to_dict(field))
+            self.__histories[field] = cached
+        return MappingProxyType(cached[1])
+
+    @property
+    def ptf_protected_value(self):
+        return self.history("protection")
+
+    @property
+    def ptf_value_history(self):
+        return self.history("ptf_value")
+
+    @property
+    def risky_exposure(self):
+        return self.history("exposure")
+
+    @property
+    def shares_owned(self):
+        return self.history("shares")
+
+    @property
+    def asset_price(self):
+        return self.history("price")
+
+    @property
+    def riskfree_bond(self):
+        return self.history("bond")
 
     def upon_notification(self, data_feed, *args, **kwargs):
 
@@ -95,50 +191,66 @@ class CppiStrategy(StatefulStrategy):
 
         return self.update(price, timestamp)
 
-    def update(self, price: float, timestamp: dt.datetime):
+    def tick_handler(self, data_feed):
+        # Only raise if the feed hands over the skipped data, to this strategy alone
+        self.skip_locked = self.fast_forward and data_feed.supports_fast_forward and len(data_feed.observers) == 1
+        return self.upon_tick
+
+    def upon_tick(self, tick):
+        """
+        Same as upon_notification, with the data pushed by the feed.
+        """
+        price = round(0.5 * (tick.bid + tick.ask), 4)
+        timestamp = tick.timestamp
+
+        # Step back by 1 time step
+        self.prev_update = self.last_update if self.last_update is not None else timestamp
+        self.last_update = timestamp
+
+        return self.update(price, timestamp, tick.year_fraction)
+
+    def update(self, price: float, timestamp, year_fraction: float = None):
 
         # ############################################################
         # 1- Update (before): assessing our current portfolio
         # ############################################################
 
-        # Keep track of time
-        dt_ = max(0.0, (timestamp - self.prev_update).total_seconds() / SECONDS_PER_YEAR)
-
-        # Record the asset price (always)
-        self.asset_price[timestamp] = price
+        # Keep track of time (precomputed by the feed, if it can)
+        if year_fraction is None:
+            year_fraction = self.year_fraction(self.prev_update, timestamp)
+        dt_ = max(0.0, year_fraction)
 
         # Bond interest accrued
-        interests = self.bond_value * self.riskfree_rate * dt_
+        bond_value = self.bond_value
+        interests = bond_value * self.riskfree_rate * dt_
 
         # Risky exposure update
         prev_sh_count = self.share_count
         exposure = prev_sh_count * price
 
         # Total investments value
-        ptf_total = exposure + self.bond_value + interests
-        self.ptf_value_history[timestamp] = ptf_total
+        ptf_total = exposure + bond_value + interests
 
         # ############################################################
         # 2- Recompute (after): reviewing portfolio composition
         # ############################################################
 
         # Only on CPPI reset dates
-        if self.is_reset(timestamp):
+        reset = self.is_reset(timestamp)
+        if reset:
 
             # Store share price at which we reset
             self.price_reset[timestamp] = price
 
             # Update the level we protect
-            prot_level_target = self.floor * ptf_total
-            self.ptf_protected_value[timestamp] = prot_level_target
+            prot_level = self.floor * ptf_total
 
             # Re-compute exposure
-            exposure_target = (ptf_total - prot_level_target) * self.multiplier
+            exposure_target = (ptf_total - prot_level) * self.multiplier
 
         else:  # just a regular update
 
             prot_level = self.ptf_protection
-            self.ptf_protected_value[timestamp] = prot_level
 
             # Re-compute exposure: no leverage
             exposure_target = min(max(0.0, ptf_total - prot_level) * self.multiplier, ptf_total)
@@ -149,13 +261,62 @@ class CppiStrategy(StatefulStrategy):
 
         # Hence a new target number of shares
         sh_count = round(exposure_target / price, 6)
-        self.shares_owned[timestamp] = sh_count
 
         # Start our bond investment (what's left after exposure)
         bond_target = max(0.0, ptf_total - exposure_target)
-        self.riskfree_bond[timestamp] = bond_target
-
-
-
-
 
+        # Record this step (in the order of RECORD_FIELDS)
+        self.record.append(timestamp, price, ptf_total, prot_level, exposure_target, sh_count, bond_target)
+
+        # Cash-locked: nothing to do until the next reset, at least while the bond stays under the protection
+        # (checked for one more step of the same length, so that short locks are not worth skipping)
+        if self.skip_locked and not reset and exposure_target <= 0.0 \
+                and bond_target + bond_target * self.riskfree_rate * dt_ <= prot_level:
+            raise EarlyTerminationException("Cash-locked until the next reset.",
+                                            until=self.last_reset + self.reset_period,
+                                            fast_forward=self.fill_locked)
+
+    def fill_locked(self, timestamps, prices) -> int:
+        """
+        Records the ticks of a cash-locked period at once: no shares, the
+        bond accruing interests. Only the first ticks where the bond remains
+        under the protection level are recorded (same as update, tick by tick).
+
+        :param timestamps: timestamps of the next ticks, as an array (int64 epoch
+                           nanoseconds, or datetime64 in datetime mode)
+        :param prices: prices of the next ticks (mid)
+        :return: number of ticks recorded
+        """
+        if not len(timestamps):
+            return 0
+
+        # Year fractions between ticks (from the last update)
+        if self.epoch_ns:
+            timestamps = np.asarray(timestamps, dtype=np.int64)
+            t = np.concatenate(([self.last_update], timestamps))
+            dt_ = np.diff(t) / NS_PER_YEAR
+        else:
+            timestamps = np.asarray(timestamps, dtype="datetime64[us]")
+            t = np.concatenate(([np.datetime64(self.last_update, "us")], timestamps)).astype(np.int64)
+            dt_ = np.diff(t) / 1e6 / SECONDS_PER_YEAR
+        np.maximum(dt_, 0.0, out=dt_)
+
+        # Bond accrual (same operations as update), as long as there is no exposure
+        prot_level = self.ptf_protection
+        rate = self.riskfree_rate
+        bond_value = self.bond_value
+        bond = []
+        for d in dt_.tolist():
+            bond_value = bond_value + bond_value * rate * d
+            if bond_value > prot_level:
+                break
+            bond.append(bond_value)
+
+        n = len(bond)
+        if not n:
+            return 0
+
+        self.record.extend(timestamps[:n], round_decimals(prices[:n], 4), bond, prot_level, 0.0, 0.0, bond)
+        self.prev_update = timestamps[n - 2].item() if n > 1 else self.last_update
+        self.last_update = timestamps[n - 1].item()
+        return n
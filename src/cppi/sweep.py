@@ -0,0 +1,156 @@
+import datetime as dt
+import itertools
+from multiprocessing import Pool, cpu_count
+from typing import List, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from paths.store import PathStore
+from src.core.feed.shared import SharedPathMatrix
+from src.core.panel import cppi_summary_metrics
+from src.cppi.vectorized import VectorizedCppiStrategy
+
+# Parameters of a sweep, in the order of the result index
+SWEEP_PARAMETERS = ("floor", "multiplier", "reset_freq", "riskfree_rate")
+
+
+def run_cells(job) -> List[pd.DataFrame]:
+    """
+    Evaluates cells of the grid sharing the same reset frequency, on a range
+    of paths (in a pool worker).
+
+    :param job: tuple (shared matrix or store, cells as parameter tuples, initial value,
+                first path, last path + 1)
+    :return: risk figures of every path (see cppi_path_metrics), one frame per cell
+    """
+    shared, cells, initial_value, start, stop = job
+
+    # Paths read once for all the cells (a view on the shared segment or the memory map)
+    matrix = shared.paths if isinstance(shared, PathStore) else shared.array
+    px = np.asarray(matrix[:, start:stop], dtype=np.float64)
+    index = pd.to_datetime(shared.index_ns)
+
+    # One row of parameters per cell, the paths being broadcast over the rows
+    floors, multipliers, reset_freqs, riskfree_rates = zip(*cells)
+    batch = VectorizedCppiStrategy(floor=0.0, initial_value=initial_value, reset_freq=reset_freqs[0])
+    batch.floor = np.array(floors)[:, None]
+    batch.multiplier = np.array(multipliers)[:, None]
+    batch.riskfree_rate = np.array(riskfree_rates)[:, None]
+
+    result = batch.run(px, index=index)
+    return [result.cell(c).path_metrics() for c in range(len(cells))]
+
+
+class CppiSweep(object):
+    """
+    CPPI risk metrics over a grid of parameters, on a single set of paths.
+
+    The paths are generated (or loaded) once by the caller. Cells sharing a
+    reset frequency are evaluated together by VectorizedCppiStrategy, by
+    batches of at most batch_paths columns (cells x paths, the paths being
+    split in ranges if there are more than batch_paths); batches are spread
+    over a process pool, the paths being published once in shared memory.
+    Per-path figures of the ranges are merged before the risk metrics are
+    computed, so results do not depend on the batching.
+
+    Memory per worker is about 6 x steps x batch_paths floats (the track
+    records of a batch), whatever the numbers of cells and paths: keep
+    batch_paths to a few thousand columns, unless the paths are short.
+
+    For example:
+
+    sweep = CppiSweep(df_paths,
+                      floors=[0.7, 0.8, 0.9],
+                      multipliers=[3.0, 5.0],
+                      reset_freqs=[dt.timedelta(days=100), dt.timedelta(days=365)],
+                      riskfree_rates=[0.02, 0.05],
+                      initial_value=100000.0)
+    table = sweep.run()
+
+    """
+
+    def __init__(self, paths: Union[pd.DataFrame, SharedPathMatrix, PathStore], floors: Sequence[float],
+                 multipliers: Sequence[float] = None, reset_freqs: Sequence[dt.timedelta] = None,
+                 riskfree_rates: Sequence[float] = None, initial_value: float = None,
+                 workers: int = None, batch_paths: int = 2 ** 12):
+        #
+        # Path source, published in shared memory when running (see BacktestRunner)
+        self.paths = paths
+
+        # Grid (None: default value of the strategy)
+        self.floors = list(floors)
+        self.multipliers = list(multipliers) if multipliers is not None else [None, ]
+        self.reset_freqs = list(reset_freqs) if reset_freqs is not None else [None, ]
+        self.riskfree_rates = list(riskfree_rates) if riskfree_rates is not None else [None, ]
+        self.initial_value = initial_value
+
+        # Scheduling
+        self.workers: int = max(1, int(workers)) if workers is not None else cpu_count()
+        self.batch_paths: int = max(1, int(batch_paths))
+
+    @property
+    def nb_paths(self):
+        return self.paths.shape[1]
+
+    @property
+    def cells(self) -> list:
+        """
+        Parameter tuples (floor, multiplier, reset_freq, riskfree_rate) of the
+        grid, defaults resolved as by the strategy (e.g. the multiplier).
+        """
+        cells = []
+        for f, m, r, rate in itertools.product(self.floors, self.multipliers, self.reset_freqs, self.riskfree_rates):
+            strategy = VectorizedCppiStrategy(floor=f, multiplier=m, reset_freq=r)
+            rate = strategy.riskfree_rate if rate is None else rate
+            cells.append((strategy.floor, strategy.multiplier, strategy.reset_freq, rate))
+        return cells
+
+    def batches(self) -> List[Tuple[list, range]]:
+        """
+        Cells grouped by reset frequency, then by batches of at most
+        batch_paths columns: (cells, range of paths) tuples.
+        """
+        nb_paths = self.nb_paths
+        width = min(nb_paths, self.batch_paths)
+        size = max(1, self.batch_paths // width)
+        ranges = [range(i, min(i + width, nb_paths)) for i in range(0, nb_paths, width)]
+
+        groups = {}
+        for cell in self.cells:
+            groups.setdefault(cell[2], []).append(cell)
+        return [(cells[i:i + size], paths) for cells in groups.values()
+                for i in range(0, len(cells), size) for paths in ranges]
+
+    def run(self) -> pd.DataFrame:
+        """
+        Risk metrics (see SummaryPanel.risk_metrics), one row per parameter tuple.
+        """
+        if isinstance(self.paths, (SharedPathMatrix, PathStore)):
+            return self.__run(self.paths)
+
+        with SharedPathMatrix.from_frame(self.paths) as shared:
+            return self.__run(shared)
+
+    def __run(self, shared: Union[SharedPathMatrix, PathStore]) -> pd.DataFrame:
+        batches = self.batches()
+        jobs = [(shared, cells, self.initial_value, paths.start, paths.stop) for cells, paths in batches]
+
+        if self.workers == 1:
+            results = list(map(run_cells, jobs))
+        else:
+            with Pool(processes=min(self.workers, len(jobs))) as pool:
+                results = pool.map(run_cells, jobs)
+
+        # Per-path figures of every cell, merged over the ranges of paths (consecutive batches)
+        cells, frames = [], []
+        for (batch_cells, paths), metrics in zip(batches, results):
+            if paths.start == 0:
+                cells += batch_cells
+                frames += [[] for _ in batch_cells]
+            for cell_frames, frame in zip(frames[-len(batch_cells):], metrics):
+                cell_frames.append(frame)
+
+        rows = [cppi_summary_metrics(pd.concat(f, ignore_index=True)) for f in frames]
+        index = pd.MultiIndex.from_tuples(cells, names=SWEEP_PARAMETERS)
+        return pd.DataFrame(rows, index=index)
@@ -0,0 +1,227 @@
+import datetime as dt
+
+import numpy as np
+import pandas as pd
+
+from src.core.analytics import cppi_control_variates
+from src.core.panel import SummaryPanel, RISK_FIELDS, cppi_path_metrics, cppi_risk_metrics
+from src.core.context.schedule import SECONDS_PER_YEAR, NS_PER_SECOND
+from src.cppi.strategy import RISKFREE_RATE, round_decimals
+
+
+class CppiBatchResult(object):
+    """
+    Track records of a batch of CPPI paths.
+
+    Every field is an array shaped (steps, paths), row k holding the state
+    of the portfolio after the k-th update (same as the CppiStrategy dicts).
+    With parameters given per cell, fields are shaped (steps, cells, paths),
+    the price being a broadcast view of the paths (see cell).
+    """
+
+    def __init__(self, index: pd.DatetimeIndex, price: np.ndarray, ptf_value: np.ndarray,
+                 protection: np.ndarray, exposure: np.ndarray, shares: np.ndarray,
+                 bond: np.ndarray, reset: np.ndarray):
+        self.index = index
+        self.price = price
+        self.ptf_value = ptf_value
+        self.protection = protection
+        self.exposure = exposure
+        self.shares = shares
+        self.bond = bond
+        self.reset = reset  # (steps, ) common to all paths
+
+    @property
+    def nb_paths(self):
+        return self.price.shape[-1]
+
+    @property
+    def nb_cells(self):
+        return self.price.shape[1] if self.price.ndim == 3 else 1
+
+    def cell(self, c: int) -> "CppiBatchResult":
+        """
+        Result of a single parameter set, as views on the fields.
+        """
+        if self.price.ndim == 2:
+            if c != 0:
+                raise IndexError("Single-cell result.")
+            return self
+        return CppiBatchResult(index=self.index, price=self.price[:, c], ptf_value=self.ptf_value[:, c],
+                               protection=self.protection[:, c], exposure=self.exposure[:, c],
+                               shares=self.shares[:, c], bond=self.bond[:, c], reset=self.reset)
+
+    def summarize(self, path: int = 0) -> pd.DataFrame:
+        """
+        Same output as AnalyticsEngine.summarize, for a single path of the batch.
+        """
+        ptf = self.ptf_value[:, path]
+        df = pd.DataFrame({"CPPI": ptf / ptf[0],
+                           "Protection": self.protection[:, path] / ptf[0],
+                           "Undl": self.price[:, path] / self.price[0, path]}, index=self.index)
+        return df
+
+    def panel(self) -> SummaryPanel:
+        """
+        Same output as AnalyticsEngine.panel, for the paths of the batch.
+        """
+        return SummaryPanel.from_batch(self)
+
+    def path_metrics(self) -> pd.DataFrame:
+        """
+        Same output as SummaryPanel.per_path, computed on the fields (no panel built).
+        """
+        return cppi_path_metrics(*(getattr(self, f) for f in RISK_FIELDS))
+
+    def risk_metrics(self, quantiles=(0.01, 0.05, 0.5, 0.95, 0.99)) -> pd.Series:
+        """
+        Same output as SummaryPanel.risk_metrics, computed on the fields (no panel built).
+        """
+        return cppi_risk_metrics(*(getattr(self, f) for f in RISK_FIELDS), quantiles=quantiles)
+
+    def control_variates(self, expectation: float) -> pd.DataFrame:
+        """
+        Same output as AnalyticsEngine.control_variates, over the paths of the batch.
+        """
+        return cppi_control_variates(self.ptf_value[-1], self.protection[-1], self.price[-1], expectation)
+
+
+class VectorizedCppiStrategy(object):
+    """
+    CPPI strategy evolved over all Monte Carlo paths at once.
+
+    The dynamics are those of CppiStrategy.update, applied to the rows of a
+    (steps, paths) price matrix: the time loop remains, but every path is
+    updated with array operations at each step. Operations and roundings are
+    those of CppiStrategy (see round_decimals): track records are the same,
+    bit for bit.
+
+    The floor, multiplier, riskfree_rate and ptf_initial_value attributes may
+    also be set to arrays holding one value per path, or shaped (cells, 1) to
+    evaluate several parameter sets at once on the same paths: prices are then
+    broadcast, not copied, and the fields of the result are shaped
+    (steps, cells, paths) (see CppiSweep).
+
+    For example, on the output of a GBM:
+
+    gbm = GeometricBrownianMotion(volatility=0.25)
+    gbm.generate(500)
+    cppi = VectorizedCppiStrategy(floor=0.8, reset_freq=dt.timedelta(days=100))
+    results = cppi.run(gbm.to_datetime_index())
+
+    """
+
+    def __init__(self, floor: float, multiplier: float = None, initial_value: float = None,
+                 reset_freq: dt.timedelta = None):
+
+        # Input characteristics (same as CppiStrategy)
+        self.floor = max(0.0, floor)  # percent
+        self.multiplier = max(0.0, multiplier) if multiplier is not None else 1.0 / (1.0 - self.floor)
+
+        # No fixed maturity
+        self.reset_freq = reset_freq if reset_freq is not None else dt.timedelta(days=365*1000)
+
+        # Hurdle rates
+        self.riskfree_rate = RISKFREE_RATE
+
+        # Portfolio (ptf) characteristics
+        self.ptf_initial_value = max(0.0, initial_value) if initial_value is not None else 1.0
+
+    def reset_schedule(self, timestamps: np.ndarray) -> np.ndarray:
+        """
+        Flags the reset dates, given the timestamps as int64 nanoseconds.
+
+        Resets do not depend on the path, only on the time grid.
+        """
+        reset = np.zeros(len(timestamps), dtype=bool)
+        if not len(timestamps):
+            return reset
+
+        freq = int(self.reset_freq.total_seconds() * NS_PER_SECOND)
+        k = 0
+        while k < len(timestamps):
+            reset[k] = True
+            target = int(timestamps[k]) + freq  # Python int: no overflow with the default frequency
+            if target > timestamps[-1]:
+                break
+            k = int(np.searchsorted(timestamps, target, side="left"))
+        return reset
+
+    def run(self, paths, index=None) -> CppiBatchResult:
+        """
+        Runs the strategy on every path.
+
+        :param paths: DataFrame (datetime index) or array shaped (steps, paths)
+        :param index: datetime index, required if paths is an array
+        :return: CppiBatchResult
+        """
+        if isinstance(paths, pd.DataFrame):
+            index = paths.index if index is None else index
+            paths = paths.to_numpy()
+
+        if index is None:
+            raise ValueError("A datetime index is required with an array of paths.")
+
+        index = pd.DatetimeIndex(index)
+        px = round_decimals(paths, 4)  # as in CppiStrategy.upon_notification
+        if px.ndim == 1:
+            px = px[:, None]
+        nb_steps, nb_paths = px.shape
+        assert len(index) == nb_steps, "index and paths must have the same number of steps"
+
+        # Time grid, truncated to the second as TimeKeeper.timestamp does
+        ts = np.asarray(index, dtype="datetime64[ns]").astype(np.int64)
+        ts = ts // NS_PER_SECOND * NS_PER_SECOND
+
+        # Year fractions between updates (0 on the first one)
+        dt_ = np.zeros(nb_steps)
+        dt_[1:] = np.maximum(0.0, np.diff(ts) / NS_PER_SECOND / SECONDS_PER_YEAR)
+
+        reset = self.reset_schedule(ts)
+
+        # State shape: (paths, ), or (cells, paths) with parameters per cell
+        floor, mult, rate = self.floor, self.multiplier, self.riskfree_rate
+        shape = np.broadcast_shapes((nb_paths, ), *(np.shape(p) for p in (floor, mult, rate, self.ptf_initial_value)))
+        if len(shape) > 2:
+            raise ValueError("Parameters must be scalars, one value per path or shaped (cells, 1).")
+
+        # Track records
+        ptf_value = np.empty((nb_steps, ) + shape)
+        protection = np.empty((nb_steps, ) + shape)
+        exposure = np.empty((nb_steps, ) + shape)
+        shares = np.empty((nb_steps, ) + shape)
+        bond = np.empty((nb_steps, ) + shape)
+
+        # Current state
+        bond_k = np.full(shape, self.ptf_initial_value, dtype=np.float64)
+        shares_k = np.zeros(shape)
+        prot_k = np.zeros(shape)
+
+        for k in range(nb_steps):
+            price = px[k]
+
+            # 1- Assessing our current portfolio (bond interests accrued)
+            ptf_total = shares_k * price + bond_k + bond_k * rate * dt_[k]  # same operations as CppiStrategy.update
+
+            # 2- Reviewing portfolio composition
+            if reset[k]:
+                prot_k = floor * ptf_total
+                exposure_target = (ptf_total - prot_k) * mult
+            else:
+                exposure_target = np.minimum(np.maximum(0.0, ptf_total - prot_k) * mult, ptf_total)
+
+            # 3- Adjusting for the next time period
+            shares_k = round_decimals(exposure_target / price, 6)
+            bond_k = np.maximum(0.0, ptf_total - exposure_target)
+
+            ptf_value[k] = ptf_total
+            protection[k] = prot_k
+            exposure[k] = exposure_target
+            shares[k] = shares_k
+            bond[k] = bond_k
+
+        if len(shape) == 2:
+            px = np.broadcast_to(px[:, None, :], ptf_value.shape)  # read-only view
+
+        return CppiBatchResult(index=index, price=px, ptf_value=ptf_value, protection=protection,
+                               exposure=exposure, shares=shares, bond=bond, reset=reset)
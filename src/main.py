@@ -1,18 +1,15 @@
 import datetime as dt
 import time
+from functools import partial
 
-from src.core.execution import ExecutionEngine
-from src.core.analytics import AnalyticsEngine
-from src.core.context.engine import ContextualEngine
-from src.core.feed.monte_carlo import MonteCarloDataFeed
+from src.core.context.runner import BacktestRunner
 from src.cppi.strategy import CppiStrategy
+from src.cppi.vectorized import VectorizedCppiStrategy
 
 if __name__ == '__main__':
     import time
 
-    from multiprocessing import Pool, cpu_count
     from paths import GeometricBrownianMotion
-    from src.core.context.engine import start_bt
 
     # Local CSV file
     #
@@ -52,24 +49,25 @@ if __name__ == '__main__':
     gbm.generate(mc_paths)
     df_paths = gbm.to_datetime_index()
 
-    analytics = AnalyticsEngine()
-    bts = []
-
-    for i in range(df_paths.shape[1]):
-        feed_i = MonteCarloDataFeed(df_paths, columns=[i, ])
-        cppi = CppiStrategy(floor=0.80,
-                            initial_value=100000.0,
-                            reset_freq=dt.timedelta(days=100))
+    # All paths at once (array operations across paths)
+    batched = True
 
-        agent_cppi_i = ExecutionEngine(cppi)
+    if batched:
+        cppi = VectorizedCppiStrategy(floor=0.80,
+                                      initial_value=100000.0,
+                                      reset_freq=dt.timedelta(days=100))
+        results = cppi.run(df_paths)
 
-        backtest_i = ContextualEngine(data=feed_i,
-                                      agent=agent_cppi_i,
-                                      analytics=analytics)
-        bts.append(backtest_i)
+    else:
+        # Strategy parameters: only the factory is sent to the workers
+        cppi_factory = partial(CppiStrategy,
+                               floor=0.80,
+                               initial_value=100000.0,
+                               reset_freq=dt.timedelta(days=100))
 
-    pool = Pool()
-    pool.map(start_bt, bts)
+        # Paths published once, chunks of columns scheduled over the pool
+        runner = BacktestRunner(df_paths, cppi_factory)
+        analytics = runner.run()
 
     print(f"The End, after {time.time()-st_time:.2f} seconds.")
 
@@ -77,3 +75,4 @@ if __name__ == '__main__':
 
     # 100: 12
     # 500: 55
+    # 500 (batched): < 1
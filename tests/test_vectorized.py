@@ -0,0 +1,42 @@
+import datetime as dt
+from functools import partial
+
+import numpy as np
+import pytest
+
+from paths import GeometricBrownianMotion
+from src.core.context.runner import BacktestRunner
+from src.cppi.strategy import CppiStrategy, RECORD_FIELDS, round_decimals
+from src.cppi.vectorized import VectorizedCppiStrategy
+
+
+@pytest.fixture(scope="module")
+def df_paths():
+    gbm = GeometricBrownianMotion(volatility=0.60, drift=0.20, initial_value=100.0,
+                                  maturity=2.0, time_intervals=730, seed=4)
+    gbm.generate(40)
+    return gbm.to_datetime_index(start=dt.datetime(2020, 1, 1))
+
+
+@pytest.mark.parametrize("multiplier, reset_days", [(None, None), (None, 100), (25.0, 100), (8.0, 30)])
+def test_engines_agree(df_paths, multiplier, reset_days):
+    # Same track records, bit for bit, from the per-path and the vectorized engines
+    reset_freq = dt.timedelta(days=reset_days) if reset_days is not None else None
+    params = dict(floor=0.8, multiplier=multiplier, initial_value=100000.0, reset_freq=reset_freq)
+
+    analytics = BacktestRunner(df_paths, partial(CppiStrategy, **params), workers=1).run()
+    batch = VectorizedCppiStrategy(**params).run(df_paths)
+
+    for field in RECORD_FIELDS:
+        per_path = np.column_stack([agent.strategy.record.column(field) for agent in analytics.realizations])
+        np.testing.assert_array_equal(per_path, getattr(batch, field), err_msg=field)
+
+
+@pytest.mark.parametrize("decimals", [4, 6])
+def test_round_decimals(decimals):
+    rng = np.random.default_rng(1)
+    x = rng.random(10000) * 1000.0
+    half = (np.floor(x * 10 ** decimals) + 0.5) / 10 ** decimals  # close to half-way
+    for values in (x, half, np.nextafter(half, 0.0), np.nextafter(half, 1e9)):
+        expected = np.array([round(v, decimals) for v in values.tolist()])
+        np.testing.assert_array_equal(round_decimals(values, decimals), expected)